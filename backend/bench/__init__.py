@@ -0,0 +1 @@
+# Synthetic data and latency benchmarks for the task API (see bench/run_bench.py).
@@ -0,0 +1,174 @@
+# bench/generate_data.py
+# Fills the configured database (DATABASE_URL, like the app) with synthetic tasks for
+# benchmarking. Distributions roughly follow the production sheet: a few agencies carry
+# most of the work, about two thirds of tasks are completed, deadlines are 1-60 days after
+# allocation, some tasks sit on the weekly planner, and a small share of task numbers
+# collide case/whitespace-insensitively so /duplicates has groups to find.
+#
+# Point it at a scratch database, never at real data:
+#   DATABASE_URL=sqlite:////tmp/bench.db python -m bench.generate_data --tasks 100000
+#   DATABASE_URL=postgresql://localhost/bench python -m bench.generate_data --tasks 100000 --reset
+#
+# Same --seed, same rows (dates are relative to today so the status mix stays stable).
+
+from sqlalchemy import insert, delete, text
+from datetime import date, datetime, timedelta
+from database import SessionLocal, engine, IS_SQLITE
+from migrations import upgrade
+from status_engine import derive_status, format_deadline_due_in
+import argparse
+import random
+import time
+import blob_store
+import models
+
+INSERT_CHUNK = 5000
+PRIORITIES = (("High", 2), ("Medium", 5), ("Low", 3), (None, 1))
+TIMES_GIVEN = ("1 day", "3 days", "1 week", "2 weeks", "1 month")
+SLOTS = [f"{hour:02d}:{minute:02d}" for hour in range(9, 18) for minute in (0, 30)]
+WORDS = (
+    "review file note approval site inspection report tender budget meeting scheme payment "
+    "survey road water school hospital audit proposal letter reply pending sanction verify "
+    "district block village committee estimate compliance grievance follow-up data upload"
+).split()
+FIRST_NAMES = (
+    "Aditya Priya Rahul Sneha Vikram Anjali Rohan Kavita Suresh Meena Arjun Pooja Manoj Divya "
+    "Karan Neha Sanjay Ritu Amit Swati"
+).split()
+DEPARTMENTS = ("DMF", "PWD", "Health", "Education", "RES", "PHE", "Revenue", "Forest")
+
+
+def _agencies(count: int, rng: random.Random):
+    names = []
+    while len(names) < count:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(DEPARTMENTS)}"
+        if name in names:
+            name = f"{name} {len(names)}"
+        names.append(name)
+    # Zipf-like: the first agencies get most of the tasks
+    weights = [1 / (rank + 1) for rank in range(count)]
+    return names, weights
+
+
+def _task(n: int, rng: random.Random, agencies, weights, today: date, now: datetime):
+    allocated = today - timedelta(days=int(rng.triangular(0, 730, 0)))
+    deadline = allocated + timedelta(days=rng.randint(1, 60)) if rng.random() < 0.9 else None
+    completion = None
+    if rng.random() < 0.65 and allocated < today:
+        done = allocated + timedelta(days=rng.randint(0, max(1, (today - allocated).days)))
+        completion = done.strftime("%d-%m-%Y") if rng.random() < 0.95 else "Close"
+    status = derive_status(completion, deadline, today)
+    if rng.random() < 0.02:
+        status = "Deleted"
+
+    scheduled_date = scheduled_time = None
+    if completion is None and rng.random() < 0.1:
+        scheduled_date = today + timedelta(days=rng.randint(-3, 14))
+        scheduled_time = rng.choice(SLOTS) if rng.random() < 0.6 else None
+
+    return {
+        "task_number": f"B-{n:07d}",
+        "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 18))).capitalize(),
+        "assigned_agency": rng.choices(agencies, weights)[0] if rng.random() < 0.97 else None,
+        "priority": rng.choices([p for p, _ in PRIORITIES], [w for _, w in PRIORITIES])[0],
+        "allocated_date": allocated,
+        "deadline_date": deadline,
+        "completion_date": completion,
+        "deadline_due_in": format_deadline_due_in(completion, deadline, today),
+        "time_given": rng.choice(TIMES_GIVEN),
+        "is_pinned": 1 if rng.random() < 0.01 else 0,
+        "scheduled_date": scheduled_date,
+        "scheduled_time": scheduled_time,
+        "position": float(n),
+        "status": status,
+        "remarks": " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 8))) if rng.random() < 0.3 else None,
+        "source": "Sheet" if rng.random() < 0.8 else "Manual",
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _attach(row: dict, rng: random.Random, pool: list):
+    # Reuse a small pool of blobs: realistic sizes without writing gigabytes
+    sha256, size = rng.choice(pool)
+    row.update(attachment_sha256=sha256, attachment_type="application/pdf", attachment_size=size)
+
+
+def generate(tasks: int, agencies: int = 40, attachments: float = 0.0, duplicates: float = 0.005,
+             seed: int = 42, reset: bool = False):
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.utcnow()
+    names, weights = _agencies(agencies, rng)
+    blob_pool = []
+    if attachments:
+        for _ in range(20):
+            blob_pool.append(blob_store.put_bytes(rng.randbytes(rng.randint(8, 256) * 1024)))
+
+    upgrade()
+    db = SessionLocal()
+    try:
+        if reset:
+            db.execute(delete(models.TaskChange))
+            db.execute(delete(models.Task))
+            db.execute(delete(models.Employee))
+            db.commit()
+        existing = {name for (name,) in db.query(models.Employee.display_name)}
+        employees = [
+            {"name": name.split(" ")[0], "display_name": name, "created_at": now}
+            for name in names if name not in existing
+        ]
+        if employees:
+            db.execute(insert(models.Employee), employees)
+            db.commit()
+        # Tasks are linked like the app links them (see employee_directory.py)
+        employee_ids = dict(db.query(models.Employee.display_name, models.Employee.id))
+
+        start_number = (db.query(models.Task.id).order_by(models.Task.id.desc()).limit(1).scalar() or 0) + 1
+        started = time.perf_counter()
+        batch = []
+        duplicated = set()
+        for n in range(start_number, start_number + tasks):
+            row = _task(n, rng, names, weights, today, now)
+            row["employee_id"] = employee_ids.get(row["assigned_agency"])
+            if blob_pool and rng.random() < attachments:
+                _attach(row, rng, blob_pool)
+            if n > start_number and rng.random() < duplicates:
+                # Same number as an earlier row once normalized: " b-0000123 " vs "B-0000123"
+                original = rng.randint(start_number, n - 1)
+                if original not in duplicated:
+                    duplicated.add(original)
+                    row["task_number"] = f" b-{original:07d} "
+            batch.append(row)
+            if len(batch) >= INSERT_CHUNK:
+                _insert(db, batch)
+                batch = []
+        _insert(db, batch)
+        print(f"✅ Inserted {tasks} tasks in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+    # Fresh planner statistics, as after a real bulk load
+    with engine.connect() as connection:
+        connection.execute(text("ANALYZE"))
+        connection.commit()
+
+
+def _insert(db, batch):
+    if not batch:
+        return
+    db.execute(insert(models.Task), batch)
+    db.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the database with synthetic tasks")
+    parser.add_argument("--tasks", type=int, default=10000, help="rows to add (1k-1M is sensible)")
+    parser.add_argument("--agencies", type=int, default=40)
+    parser.add_argument("--attachments", type=float, default=0.0, help="share of tasks with an attachment, 0-1")
+    parser.add_argument("--duplicates", type=float, default=0.005, help="share of colliding task numbers")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="delete all tasks and employees first")
+    args = parser.parse_args()
+    print(f"🔄 Generating {args.tasks} tasks into {'SQLite' if IS_SQLITE else 'Postgres'}...")
+    generate(args.tasks, args.agencies, args.attachments, args.duplicates, args.seed, args.reset)
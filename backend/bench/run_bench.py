@@ -0,0 +1,295 @@
+# bench/run_bench.py
+# Latency / throughput benchmark for the hot task API routes.
+#
+#   in-process (default): drives main.app through Starlette's TestClient, one request at a time.
+#     Measures the handler + DB cost without network or server overhead.
+#   --url http://127.0.0.1:8000: drives a running server (e.g. `uvicorn main:app --workers 4`)
+#     over HTTP with --concurrency client threads. --spawn starts that uvicorn itself.
+#
+# The database is whatever DATABASE_URL points at (fill it with bench/generate_data.py).
+# The response cache is off unless --cache is given, so repeated requests hit the DB.
+#
+#   DATABASE_URL=sqlite:////tmp/bench.db python -m bench.run_bench --json before.json
+#   ... make the change ...
+#   DATABASE_URL=sqlite:////tmp/bench.db python -m bench.run_bench --compare before.json
+#
+# Each scenario runs `--warmup` unmeasured requests, then `--requests` measured ones
+# (scenarios over the whole table use fewer; see SCENARIOS).
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+LIST_FIELDS = (
+    "id,task_number,description,assigned_agency,priority,status,allocated_date,deadline_date,"
+    "completion_date,deadline_due_in,time_given,is_pinned,scheduled_date,scheduled_time,position,"
+    "source,updated_at"
+)
+SEARCH_TERMS = ("report", "tender", "school", "inspection", "budget", "grievance", "road water")
+
+# --- Scenarios ---
+# name -> (builder(ctx, rng) -> (method, path, json body or None), request count divisor)
+# ctx holds agencies and task ids sampled from the database once.
+
+def _today():
+    return date.today()
+
+
+def _list_all(ctx, rng):
+    return "GET", f"/api/tasks/?fields={LIST_FIELDS}", None
+
+
+def _list_page(ctx, rng):
+    return "GET", f"/api/tasks/?limit=200&sort_by=deadline_date&fields={LIST_FIELDS}", None
+
+
+def _list_filtered(ctx, rng):
+    agency = urllib.request.quote(rng.choice(ctx["agencies"]))
+    return "GET", f"/api/tasks/?agency={agency}&status=Pending,Overdue&limit=200&fields={LIST_FIELDS}", None
+
+
+def _search(ctx, rng):
+    term = urllib.request.quote(rng.choice(SEARCH_TERMS))
+    return "GET", f"/api/tasks/?search={term}&limit=50&fields={LIST_FIELDS}", None
+
+
+def _stats(ctx, rng):
+    return "GET", "/api/tasks/stats", None
+
+
+def _duplicates(ctx, rng):
+    return "GET", "/api/tasks/duplicates", None
+
+
+def _bulk_update(ctx, rng):
+    ids = rng.sample(ctx["task_ids"], min(50, len(ctx["task_ids"])))
+    priority = rng.choice(("High", "Medium", "Low"))
+    return "PUT", "/api/tasks/bulk/update", {"updates": [{"id": task_id, "priority": priority} for task_id in ids]}
+
+
+def _calendar_month(ctx, rng):
+    start = _today() + timedelta(days=rng.randint(-60, 30))
+    return "GET", f"/api/calendar/feed?start={start}&end={start + timedelta(days=30)}", None
+
+
+def _calendar_full(ctx, rng):
+    return "GET", "/api/calendar/feed", None
+
+
+SCENARIOS = {
+    "list_page": (_list_page, 1),
+    "list_filtered": (_list_filtered, 1),
+    "search": (_search, 1),
+    "stats": (_stats, 1),
+    "bulk_update": (_bulk_update, 1),
+    "calendar_month": (_calendar_month, 1),
+    "duplicates": (_duplicates, 5),
+    "list_all": (_list_all, 10),
+    "calendar_full": (_calendar_full, 10),
+}
+
+# --- Clients ---
+
+class InProcessClient:
+    def __init__(self):
+        from fastapi.testclient import TestClient
+        import main
+        self.client = TestClient(main.app)
+
+    def request(self, method, path, body):
+        response = self.client.request(method, path, json=body)
+        return response.status_code, len(response.content)
+
+
+class HttpClient:
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, body):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json", "Accept-Encoding": "gzip"})
+        try:
+            with urllib.request.urlopen(req, timeout=120) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, 0
+
+# --- Measurement ---
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_scenario(client, builder, ctx, requests: int, warmup: int, concurrency: int, seed: int):
+    rng = random.Random(seed)
+    plans = [builder(ctx, rng) for _ in range(warmup + requests)]
+    for method, path, body in plans[:warmup]:
+        client.request(method, path, body)
+
+    def timed(plan):
+        started = time.perf_counter()
+        status, size = client.request(*plan)
+        return time.perf_counter() - started, status, size
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(timed, plans[warmup:]))
+    else:
+        samples = [timed(plan) for plan in plans[warmup:]]
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+    errors = sum(1 for _, status, _ in samples if status >= 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "avg_bytes": int(sum(size for _, _, size in samples) / len(samples)) if samples else 0,
+    }
+
+
+def sample_context(seed: int):
+    """Agencies and task ids to draw request parameters from."""
+    from database import SessionLocal
+    import models
+    db = SessionLocal()
+    try:
+        agencies = [a for (a,) in db.query(models.Task.assigned_agency).filter(
+            models.Task.assigned_agency != None).distinct().limit(200)]
+        task_ids = [task_id for (task_id,) in db.query(models.Task.id).order_by(models.Task.id).limit(50000)]
+        row_count = db.query(models.Task.id).count()
+    finally:
+        db.close()
+    random.Random(seed).shuffle(task_ids)
+    return {"agencies": agencies or [""], "task_ids": task_ids, "row_count": row_count}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _spawn_server(port: int, workers: int, env: dict):
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=backend_dir, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(120):
+        try:
+            urllib.request.urlopen(url + "/health", timeout=1).read()
+            return process, url
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("uvicorn did not come up within 60s")
+
+
+def print_table(results: dict, baseline: dict = None):
+    header = f"{'scenario':<16}{'n':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'KB':>9}"
+    if baseline:
+        header += f"{'Δp50':>9}{'Δp95':>9}"
+    print(header)
+    for name, r in results.items():
+        line = (f"{name:<16}{r['requests']:>6}{r['errors']:>5}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+                f"{r['p99_ms']:>10}{r['rps']:>9}{r['avg_bytes'] / 1024:>9.1f}")
+        before = (baseline or {}).get(name)
+        if before:
+            for key in ("p50_ms", "p95_ms"):
+                change = (r[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                line += f"{change:>+8.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the task API")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--spawn", action="store_true", help="start uvicorn for the HTTP run")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn")
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads (HTTP mode)")
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated subset")
+    parser.add_argument("--cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json output to diff against")
+    args = parser.parse_args()
+
+    if not args.cache:
+        os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+    # Benchmarks should not race the maintenance jobs
+    os.environ.setdefault("SCHEDULER_ENABLED", "0")
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    server = None
+    if args.spawn:
+        server, args.url = _spawn_server(args.port, args.workers, dict(os.environ))
+    try:
+        client = HttpClient(args.url) if args.url else InProcessClient()
+        from database import IS_SQLITE
+        ctx = sample_context(args.seed)
+        mode = f"http {args.url} x{args.concurrency}" if args.url else "in-process"
+        print(f"🔄 {mode}, {'SQLite' if IS_SQLITE else 'Postgres'}, {ctx['row_count']} tasks, "
+              f"cache {'on' if args.cache else 'off'}")
+
+        results = {}
+        for index, name in enumerate(names):
+            builder, divisor = SCENARIOS[name]
+            results[name] = run_scenario(client, builder, ctx, max(1, args.requests // divisor),
+                                         min(args.warmup, max(1, args.requests // divisor)),
+                                         args.concurrency if args.url else 1, args.seed + index)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+
+    if args.json_out:
+        report = {
+            "meta": {
+                "git": _git_revision(), "at": time.strftime("%Y-%m-%dT%H:%M:%S"), "mode": mode,
+                "database": "sqlite" if IS_SQLITE else "postgresql", "tasks": ctx["row_count"],
+                "cache": args.cache, "concurrency": args.concurrency,
+            },
+            "results": results,
+        }
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
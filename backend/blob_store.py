@@ -0,0 +1,161 @@
+# blob_store.py
+# Content-addressed storage for task attachments.
+# Files live under DATA_DIR/blobs/<aa>/<sha256>; identical uploads share one file.
+
+from sqlalchemy import text
+from database import DATA_DIR
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+import time
+
+BLOB_DIR = os.path.join(DATA_DIR, "blobs")
+CHUNK_SIZE = 64 * 1024
+MAX_ATTACHMENT_BYTES = int(os.getenv("MAX_ATTACHMENT_BYTES", 10 * 1024 * 1024))
+
+
+class BlobTooLarge(Exception):
+    pass
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+
+def exists(sha256: str) -> bool:
+    return bool(sha256) and os.path.exists(blob_path(sha256))
+
+
+def put_stream(chunks) -> tuple:
+    """
+    Writes an iterable of byte chunks to the store while hashing it.
+    Returns (sha256, size). Re-uploading the same content is a no-op.
+    """
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=BLOB_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > MAX_ATTACHMENT_BYTES:
+                    raise BlobTooLarge(f"Attachment exceeds {MAX_ATTACHMENT_BYTES} bytes")
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        sha256 = digest.hexdigest()
+        target = blob_path(sha256)
+        if os.path.exists(target):
+            os.remove(tmp_path)
+            os.utime(target)  # restart the GC grace period for the new reference
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+        return sha256, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def put_file(fileobj) -> tuple:
+    return put_stream(iter(lambda: fileobj.read(CHUNK_SIZE), b""))
+
+
+def put_bytes(data: bytes) -> tuple:
+    return put_stream([data])
+
+
+def decode_data_url(value: str) -> tuple:
+    """
+    Parses the legacy inline format ("data:image/png;base64,...." or bare base64).
+    Returns (content_type, raw_bytes).
+    """
+    content_type = "application/octet-stream"
+    payload = value.strip()
+    if payload.startswith("data:") and "," in payload:
+        header, payload = payload.split(",", 1)
+        content_type = header[5:].split(";", 1)[0] or content_type
+    try:
+        return content_type, base64.b64decode(payload, validate=False)
+    except (binascii.Error, ValueError):
+        raise ValueError("attachment_data is not valid base64")
+
+
+def collect_garbage(connection, grace_seconds: int = 3600) -> int:
+    """
+    Deletes blobs that no task references any more. Returns the number removed.
+    Files younger than `grace_seconds` are kept: an upload writes the blob before its row commits.
+    """
+    if not os.path.isdir(BLOB_DIR):
+        return 0
+    cutoff = time.time() - grace_seconds
+    rows = connection.execute(
+        text("SELECT DISTINCT attachment_sha256 FROM tasks WHERE attachment_sha256 IS NOT NULL")
+    )
+    referenced = {row[0] for row in rows}
+    removed = 0
+    for prefix in os.listdir(BLOB_DIR):
+        folder = os.path.join(BLOB_DIR, prefix)
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if name not in referenced and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def migrate_inline_attachments(connection, batch_size: int = 100) -> int:
+    """
+    One-off move of legacy `tasks.attachment_data` base64 values into the store.
+    Each migrated row gets its hash/type/size set and the inline column cleared.
+    """
+    migrated = 0
+    while True:
+        rows = connection.execute(
+            text("SELECT id, attachment_data FROM tasks WHERE attachment_data IS NOT NULL LIMIT :n"),
+            {"n": batch_size},
+        ).fetchall()
+        if not rows:
+            break
+
+        for task_id, data in rows:
+            values = {"id": task_id, "sha": None, "type": None, "size": None}
+            try:
+                if data and data.strip():
+                    content_type, raw = decode_data_url(data)
+                    sha256, size = put_bytes(raw)
+                    values.update(sha=sha256, type=content_type, size=size)
+            except Exception as e:
+                print(f"⚠️ Attachment for task {task_id} could not be migrated: {e}")
+
+            connection.execute(
+                text(
+                    "UPDATE tasks SET attachment_sha256 = :sha, attachment_type = :type, "
+                    "attachment_size = :size, attachment_data = NULL WHERE id = :id"
+                ),
+                values,
+            )
+            migrated += 1
+        connection.commit()
+    return migrated
+
+
+if __name__ == "__main__":
+    from database import engine
+    from sqlalchemy import inspect
+
+    columns = [c["name"] for c in inspect(engine).get_columns("tasks")]
+    if "attachment_data" not in columns:
+        print("No inline attachment column; nothing to migrate.")
+    else:
+        with engine.connect() as conn:
+            count = migrate_inline_attachments(conn)
+        print(f"Migrated {count} inline attachments into {BLOB_DIR}")
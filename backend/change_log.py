@@ -0,0 +1,68 @@
+# change_log.py
+# Append-only log of task changes with a monotonically increasing version.
+# Writers record ids inside their own transaction; readers ask "what changed since v?".
+# Deletes leave a tombstone so clients can drop rows they have cached.
+
+from sqlalchemy import insert, select, delete, func, literal
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import models
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+def record(db: Session, task_ids, op: str = UPSERT):
+    """Logs changed task ids; call before db.commit() so the entry commits with the change."""
+    task_ids = list(task_ids)
+    if task_ids:
+        db.execute(insert(models.TaskChange), [{"task_id": task_id, "op": op} for task_id in task_ids])
+
+
+def record_matching(db: Session, *criteria):
+    """Set-based variant: logs every task matching `criteria` with one INSERT ... SELECT."""
+    rows = select(models.Task.id, literal(UPSERT)).where(*criteria)
+    db.execute(insert(models.TaskChange).from_select(["task_id", "op"], rows))
+
+
+def current_version(db: Session) -> int:
+    return db.query(func.max(models.TaskChange.version)).scalar() or 0
+
+
+def changes_since(db: Session, since: int, limit: int):
+    """
+    Returns (task_ids, next_version, has_more, reset).
+    task_ids are the ids whose latest change is in (since, next_version], oldest first.
+    reset=True means `since` predates the retained log and the client must reload fully.
+    """
+    latest, oldest = db.query(func.max(models.TaskChange.version), func.min(models.TaskChange.version)).one()
+    latest = latest or 0
+    if oldest is not None and since < oldest - 1:
+        return [], latest, False, True
+    if since >= latest:
+        return [], latest, False, False
+
+    last_change = func.max(models.TaskChange.version).label("last_change")
+    rows = (
+        db.query(models.TaskChange.task_id, last_change)
+        .filter(models.TaskChange.version > since)
+        .group_by(models.TaskChange.task_id)
+        .order_by(last_change)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_version = rows[-1].last_change if has_more else latest
+    return [row.task_id for row in rows], next_version, has_more, False
+
+
+def prune(db: Session, keep_days: int = 30) -> int:
+    """Drops entries older than `keep_days`, always keeping the newest one."""
+    cutoff = datetime.utcnow() - timedelta(days=keep_days)
+    latest = current_version(db)
+    result = db.execute(
+        delete(models.TaskChange)
+        .where(models.TaskChange.changed_at < cutoff, models.TaskChange.version < latest)
+    )
+    return result.rowcount or 0
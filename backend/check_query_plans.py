@@ -0,0 +1,110 @@
+# check_query_plans.py
+# EXPLAINs the hot dashboard queries against the configured database and exits 1 if
+# any of them falls back to a full table scan (or, for paged lists, a full sort).
+# Built from the same query helpers the routes use, so it tracks code changes.
+#
+# Plans depend on table statistics, so run it against a copy of real data:
+# on a near-empty table SQLite rightly prefers a sort over an index walk.
+#
+# Usage: python check_query_plans.py        (uses DATABASE_URL, like the app)
+
+from sqlalchemy import func, text
+from datetime import date, timedelta
+from database import SessionLocal
+from migrations import upgrade
+from status_engine import OPEN_STATUSES
+from pagination import encode_cursor
+from routers.tasks import apply_task_filters, apply_keyset, stats_queries
+from routers.calendar import _feed_query, FEED_COLUMNS
+import sys
+import models
+
+PAGE = 50
+MIN_REPRESENTATIVE_ROWS = 1000
+
+
+def _page(db, agency=None, status=None, sort_key="id", cursor=None):
+    query, _ = apply_task_filters(db.query(models.Task.id), agency, status, None)
+    return apply_keyset(query, sort_key, cursor).limit(PAGE + 1)
+
+
+def hot_queries(db):
+    today = date.today()
+    deadline_cursor = encode_cursor("deadline_date", today, 1)
+    # Employees filter on employee_id, other agency names on the text
+    employee = db.query(models.Employee.display_name).order_by(models.Employee.id).limit(1).scalar() or "Agency 1"
+    return [
+        ("list: status + deadline sort", _page(db, status="Pending", sort_key="deadline_date"), True),
+        ("list: open statuses + deadline sort", _page(db, status="Pending,Overdue", sort_key="deadline_date"), True),
+        ("list: employee + status + deadline sort", _page(db, agency=employee, status="Pending", sort_key="deadline_date"), True),
+        ("list: free-text agency + status + deadline sort", _page(db, agency="Unlisted Agency", status="Pending", sort_key="deadline_date"), True),
+        ("list: agencies + deadline sort", _page(db, agency=f"{employee},Unlisted Agency", sort_key="deadline_date"), False),
+        ("list: deadline sort", _page(db, sort_key="deadline_date"), True),
+        ("list: deadline sort, next page", _page(db, sort_key="deadline_date", cursor=deadline_cursor), True),
+        ("list: manual order", _page(db, sort_key="position"), True),
+        ("stats: per-employee counts", stats_queries(db)[0], False),
+        ("stats: per-agency-name counts", stats_queries(db)[1], False),
+        ("rollover: open tasks", db.query(models.Task.id).filter(models.Task.status.in_(OPEN_STATUSES)), False),
+        ("planner: scheduled week", db.query(models.Task.id).filter(
+            models.Task.scheduled_date.between(today, today + timedelta(days=6))
+        ).order_by(models.Task.scheduled_date, models.Task.scheduled_time), False),
+        ("calendar: date window", _feed_query(db, FEED_COLUMNS, None, today, today + timedelta(days=30)), False),
+        ("calendar: validator", _feed_query(db, [func.max(models.Task.updated_at)], None, None, None), False),
+    ]
+
+
+def explain(db, query):
+    bind = db.get_bind()
+    sql = str(query.statement.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True}))
+    if bind.dialect.name == "postgresql":
+        # Tiny tables always plan as Seq Scan; ask whether an index path exists at all
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        return [row[0] for row in db.execute(text("EXPLAIN " + sql))]
+    return [row[-1] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+
+def problems(plan, dialect, paged):
+    found = []
+    for line in plan:
+        if dialect == "postgresql":
+            if "Seq Scan on tasks" in line:
+                found.append(line.strip())
+        else:
+            if line.startswith("SCAN tasks") and "INDEX" not in line:
+                found.append(line)
+            if paged and "TEMP B-TREE FOR ORDER BY" in line:
+                found.append(line)
+    return found
+
+
+def main():
+    upgrade()
+    db = SessionLocal()
+    failures = 0
+    try:
+        dialect = db.get_bind().dialect.name
+        rows = db.query(func.count(models.Task.id)).scalar()
+        if rows < MIN_REPRESENTATIVE_ROWS:
+            print(f"⚠️ Only {rows} tasks; plans on a table this small may not match production.")
+        for name, query, paged in hot_queries(db):
+            plan = explain(db, query)
+            issues = problems(plan, dialect, paged)
+            if issues:
+                failures += 1
+                print(f"❌ {name}")
+                for line in plan:
+                    print(f"     {line}")
+            else:
+                print(f"✅ {name}")
+            db.rollback()
+    finally:
+        db.close()
+
+    if failures:
+        print(f"\n{failures} hot queries are not index-backed.")
+        sys.exit(1)
+    print("\nAll hot queries are index-backed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# compress_assets.py
+# Writes .gz (and .br when the `brotli` package is installed) next to each compressible
+# file of the frontend build, for static_files.PrecompressedStaticFiles to serve.
+# Run after `npm run build`; the Dockerfile does this automatically.
+#
+# Usage: python compress_assets.py [dist_dir]     (default: ../frontend/dist)
+
+import gzip
+import os
+import sys
+
+COMPRESSIBLE = (".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".ico", ".wasm")
+MIN_SIZE = 1024
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def compress_tree(root: str):
+    written = saved = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(directory, name)
+            with open(path, "rb") as f:
+                raw = f.read()
+            if len(raw) < MIN_SIZE:
+                continue
+
+            variants = [(".gz", gzip.compress(raw, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append((".br", brotli.compress(raw, quality=11)))
+            for suffix, data in variants:
+                if len(data) >= len(raw):
+                    continue
+                with open(path + suffix, "wb") as f:
+                    f.write(data)
+                written += 1
+                saved += len(raw) - len(data)
+    return written, saved
+
+
+if __name__ == "__main__":
+    default_dist = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../frontend/dist")
+    dist = sys.argv[1] if len(sys.argv) > 1 else default_dist
+    if not os.path.isdir(dist):
+        print(f"❌ {dist} not found; build the frontend first.")
+        sys.exit(1)
+    written, saved = compress_tree(dist)
+    print(f"✅ Wrote {written} precompressed files ({saved // 1024} KiB smaller){'' if brotli else ' (gzip only: brotli not installed)'}.")
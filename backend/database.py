@@ -1,6 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.concurrency import run_in_threadpool
 
 import os
 
@@ -20,13 +22,61 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(DA
 if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
     SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-connect_args = {"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
+# Async driver for the same database (aiosqlite / asyncpg)
+ASYNC_DRIVERS = {"sqlite://": "sqlite+aiosqlite://", "postgresql://": "postgresql+asyncpg://"}
+ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL
+for sync_prefix, async_prefix in ASYNC_DRIVERS.items():
+    if SQLALCHEMY_DATABASE_URL.startswith(sync_prefix):
+        ASYNC_DATABASE_URL = async_prefix + SQLALCHEMY_DATABASE_URL[len(sync_prefix):]
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args=connect_args
-)
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+# --- Engine tuning (all overridable via environment) ---
+# Applied to every new SQLite connection. WAL lets readers run alongside the single writer;
+# busy_timeout makes writers wait for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 10000)),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64000)),  # negative = KiB, i.e. 64 MB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+}
+if not IS_SQLITE:
+    # Server databases drop idle connections; recycle and ping so we never hand out a dead one
+    POOL_SETTINGS["pool_recycle"] = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    POOL_SETTINGS["pool_pre_ping"] = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def make_engine(url: str, is_async: bool = False):
+    """Engine factory: per-backend pool settings, plus performance pragmas for SQLite."""
+    kwargs = dict(POOL_SETTINGS)
+    if IS_SQLITE and not is_async:
+        kwargs["connect_args"] = {"check_same_thread": False}
+
+    db_engine = create_async_engine(url, **kwargs) if is_async else create_engine(url, **kwargs)
+    if IS_SQLITE:
+        sync_engine = db_engine.sync_engine if is_async else db_engine
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+    return db_engine
+
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = make_engine(ASYNC_DATABASE_URL, is_async=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -35,3 +85,30 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def _pool_status(pool) -> dict:
+    stats = {"type": type(pool).__name__}
+    for key in ("size", "checkedin", "checkedout", "overflow"):
+        getter = getattr(pool, key, None)
+        if callable(getter):
+            stats[key] = getter()
+    return stats
+
+def pool_stats() -> dict:
+    """Connection pool usage for the sync and async engines."""
+    return {"sync": _pool_status(engine.pool), "async": _pool_status(async_engine.sync_engine.pool)}
+
+async def get_async_db():
+    """AsyncSession dependency for `async def` routes; sync query helpers can run via run_sync."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def run_in_session(function, *args):
+    """
+    Runs `function(db, *args)` on the threadpool with its own sync Session.
+    For heavy reads behind `async def` routes: query, row building and encoding stay off the event loop.
+    """
+    def call():
+        with SessionLocal() as db:
+            return function(db, *args)
+    return await run_in_threadpool(call)
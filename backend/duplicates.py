@@ -0,0 +1,117 @@
+# duplicates.py
+# Duplicate task detection.
+# Exact mode groups by the normalized task number in SQL (backed by an expression index);
+# fuzzy mode finds near-identical descriptions with token blocking + difflib.
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from difflib import SequenceMatcher
+import re
+import models
+
+# Columns the DuplicatesModal renders; keeps attachments and remarks off the wire
+DUPLICATE_COLUMNS = [
+    models.Task.id,
+    models.Task.task_number,
+    models.Task.description,
+    models.Task.assigned_agency,
+    models.Task.deadline_date,
+    models.Task.status,
+    models.Task.source,
+    models.Task.created_at,
+]
+
+FUZZY_DEFAULT_THRESHOLD = 0.85
+# Tokens shared by more than this many tasks are too common to block on
+FUZZY_MAX_BLOCK_SIZE = 200
+FUZZY_BLOCK_TOKENS = 2
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def task_number_key():
+    """The normalized duplicate key; must match the ix_tasks_task_number_key expression."""
+    return func.lower(func.trim(models.Task.task_number))
+
+
+def _not_deleted():
+    return or_(models.Task.status.is_(None), models.Task.status != "Deleted")
+
+
+def _as_dict(row):
+    return {column.key: getattr(row, column.key) for column in DUPLICATE_COLUMNS}
+
+
+def find_exact_groups(db: Session):
+    key = task_number_key()
+    duplicate_keys = (
+        db.query(key)
+        .filter(models.Task.task_number.isnot(None), key != "", _not_deleted())
+        .group_by(key)
+        .having(func.count(models.Task.id) > 1)
+    )
+
+    rows = (
+        db.query(*DUPLICATE_COLUMNS, key.label("dup_key"))
+        .filter(key.in_(duplicate_keys.scalar_subquery()), _not_deleted())
+        .order_by(key, models.Task.id)
+        .all()
+    )
+
+    groups = {}
+    for row in rows:
+        groups.setdefault(row.dup_key, []).append(_as_dict(row))
+    return list(groups.values())
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def find_fuzzy_groups(db: Session, threshold: float = FUZZY_DEFAULT_THRESHOLD):
+    """
+    Groups tasks whose normalized descriptions are at least `threshold` similar.
+    Only pairs sharing one of their rarest words are compared, so cost stays near-linear.
+    """
+    rows = (
+        db.query(*DUPLICATE_COLUMNS)
+        .filter(models.Task.description.isnot(None), _not_deleted())
+        .all()
+    )
+    docs = []
+    for row in rows:
+        normalized = _normalize(row.description)
+        if normalized:
+            docs.append((row, normalized, set(normalized.split())))
+
+    postings = {}
+    for index, (_, _, tokens) in enumerate(docs):
+        for token in tokens:
+            postings.setdefault(token, []).append(index)
+
+    parent = list(range(len(docs)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, (_, text_i, tokens_i) in enumerate(docs):
+        rare = sorted(
+            (t for t in tokens_i if len(postings[t]) <= FUZZY_MAX_BLOCK_SIZE),
+            key=lambda t: len(postings[t]),
+        )[:FUZZY_BLOCK_TOKENS]
+        candidates = {j for token in rare for j in postings[token] if j > i}
+        for j in candidates:
+            if find(i) == find(j):
+                continue
+            matcher = SequenceMatcher(None, text_i, docs[j][1], autojunk=False)
+            if matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold \
+                    and matcher.ratio() >= threshold:
+                parent[find(j)] = find(i)
+
+    groups = {}
+    for index, (row, _, _) in enumerate(docs):
+        groups.setdefault(find(index), []).append(_as_dict(row))
+    return [group for group in groups.values() if len(group) > 1]
@@ -0,0 +1,141 @@
+# employee_directory.py
+# Link between tasks and employees.
+#
+# Tasks keep `assigned_agency` (the text every client shows and sends); `employee_id` is set
+# next to it whenever that text is an employee's display name. Writes resolve the id from
+# the database, so it is always right. Reads (agency filters, stats) translate names
+# through an in-memory id <-> display_name map so they can filter and group on the integer
+# key, so every write path must link: create/update/bulk/import resolve the id, employee
+# create/rename links matching tasks, and scheduler.py relinks stragglers nightly (a task
+# written while its employee was being created). Names that aren't employees match on the text.
+#
+# The map is reloaded after employee writes in this process and at most every
+# DIRECTORY_TTL_SECONDS otherwise. So after a rename on another worker, this one keeps
+# mapping the old name to the renamed employee's id (and doesn't know the new name) for up
+# to that long: filters on the old name still return that employee's tasks.
+
+from sqlalchemy import update, select, or_
+from sqlalchemy.orm import Session
+from typing import Optional
+import os
+import threading
+import time
+import models
+import task_events
+import change_log
+
+DIRECTORY_TTL_SECONDS = float(os.getenv("EMPLOYEE_DIRECTORY_TTL_SECONDS", 30))
+
+_lock = threading.Lock()
+_by_id = {}
+_by_name = {}
+_loaded_at = None
+
+
+@task_events.subscribe
+def _invalidate(topic, action, ids, rows):
+    global _loaded_at
+    if topic == "employees":
+        _loaded_at = None
+
+
+def _ensure_loaded(session: Session):
+    global _by_id, _by_name, _loaded_at
+    if _loaded_at is not None and time.monotonic() - _loaded_at < DIRECTORY_TTL_SECONDS:
+        return
+    rows = session.query(models.Employee.id, models.Employee.display_name).all()
+    with _lock:
+        _by_id = {employee_id: name for employee_id, name in rows}
+        _by_name = {name: employee_id for employee_id, name in rows}
+        _loaded_at = time.monotonic()
+
+
+def name_for(session: Session, employee_id: int) -> Optional[str]:
+    _ensure_loaded(session)
+    return _by_id.get(employee_id)
+
+
+def agency_condition(session: Session, agency: str):
+    """
+    WHERE clause for an `agency` filter (comma separated display names): known employees
+    match on employee_id, anything else on the assigned_agency text.
+    """
+    _ensure_loaded(session)
+    names = [a.strip() for a in agency.split(',')]
+    ids = [_by_name[name] for name in names if name in _by_name]
+    others = [name for name in names if name not in _by_name]
+
+    conditions = []
+    if ids:
+        conditions.append(models.Task.employee_id == ids[0] if len(ids) == 1 else models.Task.employee_id.in_(ids))
+    if others:
+        conditions.append(
+            models.Task.assigned_agency == others[0] if len(others) == 1 else models.Task.assigned_agency.in_(others)
+        )
+    return conditions[0] if len(conditions) == 1 else or_(*conditions)
+
+# --- Writes ---
+
+def resolve_ids(db: Session, names) -> dict:
+    """display_name -> employee id for the given names, straight from the database."""
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    return dict(
+        db.query(models.Employee.display_name, models.Employee.id)
+        .filter(models.Employee.display_name.in_(names)).all()
+    )
+
+
+def resolve_id(db: Session, name: Optional[str]) -> Optional[int]:
+    return resolve_ids(db, [name]).get(name)
+
+
+def link_tasks(db: Session, employee_id: int, display_name: str) -> int:
+    """After an employee is created or renamed: tasks whose text already names them get the id."""
+    criteria = (models.Task.assigned_agency == display_name, models.Task.employee_id.is_(None))
+    change_log.record_matching(db, *criteria)
+    result = db.execute(
+        update(models.Task).where(*criteria).values(employee_id=employee_id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+def link_unlinked_tasks(db: Session) -> int:
+    """Safety net: links every task whose text names an employee but has no employee_id."""
+    names = select(models.Employee.display_name)
+    criteria = (models.Task.employee_id.is_(None), models.Task.assigned_agency.in_(names))
+    change_log.record_matching(db, *criteria)
+    employee_id = (
+        select(models.Employee.id)
+        .where(models.Employee.display_name == models.Task.assigned_agency)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(models.Task).where(*criteria).values(employee_id=employee_id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+def rename_tasks(db: Session, employee_id: int, display_name: str) -> int:
+    """After a rename: the employee's tasks show the new display name."""
+    criteria = (models.Task.employee_id == employee_id, models.Task.assigned_agency.is_distinct_from(display_name))
+    change_log.record_matching(db, *criteria)
+    result = db.execute(
+        update(models.Task).where(*criteria).values(assigned_agency=display_name)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+def unlink_tasks(db: Session, employee_id: int) -> int:
+    """Before an employee is deleted: their tasks keep the text but lose the link."""
+    criteria = (models.Task.employee_id == employee_id,)
+    change_log.record_matching(db, *criteria)
+    result = db.execute(
+        update(models.Task).where(*criteria).values(employee_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
@@ -0,0 +1,70 @@
+# event_stream.py
+# Fans task_events out to connected browsers over Server-Sent Events.
+# Each client gets a bounded asyncio.Queue; publishers run in worker threads, so
+# messages are handed to the event loop with call_soon_threadsafe.
+# Note: clients only see writes made by the worker they are connected to.
+
+import asyncio
+import json
+import threading
+from datetime import date, datetime
+import task_events
+
+QUEUE_SIZE = 256
+# Tells the client its queue overflowed and it must reload everything
+RESYNC = {"action": "resync"}
+
+_clients = set()  # (loop, queue)
+_clients_lock = threading.Lock()
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def format_message(topic: str, payload: dict) -> str:
+    data = json.dumps(payload, default=_json_default, separators=(",", ":"))
+    return f"event: {topic}\ndata: {data}\n\n"
+
+
+def _deliver(queue: asyncio.Queue, message: str):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        # Slow consumer: replace the backlog with a single resync instruction
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(format_message("tasks", RESYNC))
+
+
+@task_events.subscribe
+def broadcast(topic, action, ids, rows=None):
+    with _clients_lock:
+        clients = list(_clients)
+    if not clients:
+        return
+    message = format_message(topic, {"action": action, "ids": ids, "rows": rows})
+    for loop, queue in clients:
+        try:
+            loop.call_soon_threadsafe(_deliver, queue, message)
+        except RuntimeError:
+            # Loop already closed (shutdown); the client is gone
+            disconnect((loop, queue))
+
+
+def connect():
+    client = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+    with _clients_lock:
+        _clients.add(client)
+    return client
+
+
+def disconnect(client):
+    with _clients_lock:
+        _clients.discard(client)
+
+
+def client_count() -> int:
+    return len(_clients)
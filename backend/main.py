@@ -1,8 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from database import engine, Base, SessionLocal
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
+from static_files import PrecompressedStaticFiles, file_response
+from database import SessionLocal, pool_stats
+from contextlib import asynccontextmanager
+import response_cache
+import scheduler
+import metrics
+import sql_diagnostics
 from routers import tasks, auth
 import os
 from dotenv import load_dotenv
@@ -10,53 +16,22 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Create Tables
-Base.metadata.create_all(bind=engine)
-
-# --- Auto-Migration: Add columns if missing ---
-from sqlalchemy import text
-def run_migrations():
-    try:
-        with engine.connect() as connection:
-            result = connection.execute(text("PRAGMA table_info(tasks)"))
-            columns = [row[1] for row in result.fetchall()]
-
-            if "is_pinned" not in columns:
-                print("🔄 Migration: Adding 'is_pinned' column...")
-                connection.execute(text("ALTER TABLE tasks ADD COLUMN is_pinned INTEGER DEFAULT 0"))
-                connection.commit()
-
-            if "scheduled_date" not in columns:
-                print("🔄 Migration: Adding 'scheduled_date' column...")
-                connection.execute(text("ALTER TABLE tasks ADD COLUMN scheduled_date DATE"))
-                connection.commit()
-
-            if "position" not in columns:
-                print("🔄 Migration: Adding 'position' column...")
-                connection.execute(text("ALTER TABLE tasks ADD COLUMN position FLOAT DEFAULT 0.0"))
-                connection.commit()
-
-            if "scheduled_time" not in columns:
-                print("🔄 Migration: Adding 'scheduled_time' column...")
-                connection.execute(text("ALTER TABLE tasks ADD COLUMN scheduled_time VARCHAR"))
-                connection.commit()
-
-            if "attachment_data" not in columns:
-                print("🔄 Migration: Adding 'attachment_data' column...")
-                connection.execute(text("ALTER TABLE tasks ADD COLUMN attachment_data TEXT"))
-                connection.commit()
-
-            print("✅ Migrations complete.")
-    except Exception as e:
-        print(f"❌ Migration Error: {e}")
-
-run_migrations()
+# Create tables / apply pending schema migrations (no-op when already current)
+from migrations import upgrade
+upgrade()
 
 # Seed Admin User
 from seed_auth import seed_admin
 seed_admin()
 
-app = FastAPI(title="Task Dashboard API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Daily rollover, DB upkeep, log rotation and GC (one leader across workers)
+    scheduler.start()
+    yield
+    scheduler.shutdown()
+
+app = FastAPI(title="Task Dashboard API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -64,30 +39,72 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
+# Compress JSON/HTML on the fly. Starlette skips text/event-stream (SSE), images,
+# range responses and anything that already has a Content-Encoding (precompressed assets).
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=6)
+
+# Outermost, so the timings include compression
+if metrics.METRICS_ENABLED:
+    metrics.instrument_engines()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Slow-query / N+1 report (SQL_DIAGNOSTICS=1)
+sql_diagnostics.install(app)
+
 app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
 app.include_router(auth.router, prefix="/api")
 
+# Export/import live under /api/tasks too
+from routers import transfer
+app.include_router(transfer.router, prefix="/api/tasks", tags=["transfer"])
+
 from routers import employees
 app.include_router(employees.router, prefix="/api/employees", tags=["employees"])
 
 from routers import calendar
 app.include_router(calendar.router, prefix="/api/calendar", tags=["calendar"])
 
+from routers import events
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+
+@app.get("/health")
+def health_check():
+    return {
+        "status": "ok",
+        "service": "Task Dashboard API",
+        "db_pool": pool_stats(),
+        "response_cache": response_cache.stats(),
+        "scheduler": scheduler.status(),
+    }
+
+if metrics.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        """Prometheus scrape endpoint (per-route latency, SQL counts, pool usage)."""
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Serve React Frontend (Single Service Mode)
 frontend_dist = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../frontend/dist")
 
 if os.path.exists(frontend_dist):
-    app.mount("/assets", StaticFiles(directory=os.path.join(frontend_dist, "assets")), name="assets")
+    # Hashed bundles: cached forever, precompressed siblings served when present
+    dist_root = os.path.realpath(frontend_dist)
+    app.mount("/assets", PrecompressedStaticFiles(directory=os.path.join(frontend_dist, "assets")), name="assets")
 
     @app.get("/{full_path:path}")
-    async def serve_react_app(full_path: str):
+    async def serve_react_app(full_path: str, request: Request):
         if full_path.startswith("api"):
             from fastapi import HTTPException
             raise HTTPException(status_code=404, detail="API Endpoint not found")
-        return FileResponse(os.path.join(frontend_dist, "index.html"))
-
-@app.get("/health")
-def health_check():
-    return {"status": "ok", "service": "Task Dashboard API"}
+        # Unhashed top-level files (favicon etc.) get a short cache; everything else is the SPA shell,
+        # which must always be revalidated so new deploys pick up the new bundle names
+        file_path = os.path.realpath(os.path.join(frontend_dist, full_path))
+        # commonpath, not a string prefix: "dist-old/..." must not count as inside "dist"
+        if full_path and os.path.isfile(file_path) and os.path.commonpath([file_path, dist_root]) == dist_root:
+            cache_control = "public, max-age=3600"
+        else:
+            file_path, cache_control = os.path.join(frontend_dist, "index.html"), "no-cache"
+        return file_response(file_path, request.headers, cache_control)
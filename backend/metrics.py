@@ -0,0 +1,195 @@
+# metrics.py
+# Request and database instrumentation, exported in the Prometheus text format at /metrics.
+#
+# - MetricsMiddleware times every request and labels it with the matched route template
+#   ("/api/tasks/{task_id}", not the raw path), so label cardinality stays bounded.
+# - Statement counts and DB time come from sql_timing.py's cursor hooks; the numbers are
+#   attributed to the request through a context variable (sync routes run in the threadpool
+#   with a copy of the request's context, async routes share it directly).
+# - Pool gauges are read from database.pool_stats() at scrape time.
+#
+# Metrics are per process: with several uvicorn workers each scrape sees one worker.
+# METRICS_ENABLED=0 turns the middleware and /metrics off.
+
+from contextvars import ContextVar
+from database import pool_stats
+import os
+import threading
+import time
+import sql_timing
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_lock = threading.Lock()
+
+
+class _RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+_current = ContextVar("metrics_request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, labels: tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.series.items()):
+            base = _labels(label_names, labels)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+ROUTE_LABELS = ("method", "route")
+_request_duration = Histogram("http_request_duration_seconds", "Request latency by route.", LATENCY_BUCKETS)
+_request_statements = Histogram("db_statements_per_request", "SQL statements executed per request.", STATEMENT_BUCKETS)
+_request_db_time = Histogram("db_time_per_request_seconds", "Time spent in SQL per request.", DB_TIME_BUCKETS)
+_requests_total = {}     # (method, route, status) -> count
+_statements_total = {}   # (method, route) -> count
+_in_progress = {}        # method -> gauge
+_background = {"statements": 0, "seconds": 0.0}  # SQL outside any request (scheduler, startup)
+
+# --- SQL accounting ---
+
+def _record_statement(conn, statement, parameters, executemany, elapsed):
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    else:
+        with _lock:
+            _background["statements"] += 1
+            _background["seconds"] += elapsed
+
+
+def instrument_engines():
+    sql_timing.add_listener(_record_statement)
+
+# --- Middleware ---
+
+def route_template(scope) -> str:
+    """
+    "/api/tasks/{task_id}" for "/api/tasks/42". The matched route only knows its path inside
+    its router, so the include prefix is recovered by rendering that path with the params.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    path = scope.get("path", "")
+    try:
+        rendered = template.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return template
+    if rendered and path.endswith(rendered):
+        return path[:len(path) - len(rendered)] + template
+    return template
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses (SSE, exports) are timed to their last byte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stats = _RequestStats()
+        token = _current.set(stats)
+        with _lock:
+            _in_progress[method] = _in_progress.get(method, 0) + 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            labels = (method, route_template(scope))
+            with _lock:
+                _in_progress[method] -= 1
+                _request_duration.observe(labels, elapsed)
+                _request_statements.observe(labels, stats.statements)
+                _request_db_time.observe(labels, stats.db_seconds)
+                key = labels + (status["code"],)
+                _requests_total[key] = _requests_total.get(key, 0) + 1
+                _statements_total[labels] = _statements_total.get(labels, 0) + stats.statements
+
+# --- Exposition ---
+
+def _counter(name, help_text, label_names, values: dict):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for labels, value in sorted(values.items()):
+        lines.append(f"{name}{{{_labels(label_names, labels)}}} {value}")
+    return lines
+
+
+def render() -> str:
+    with _lock:
+        lines = []
+        lines += _counter("http_requests_total", "Requests by route and status.",
+                          ROUTE_LABELS + ("status",), _requests_total)
+        lines += ["# HELP http_requests_in_progress Requests currently being served.",
+                  "# TYPE http_requests_in_progress gauge"]
+        lines += [f'http_requests_in_progress{{method="{method}"}} {count}' for method, count in sorted(_in_progress.items())]
+        lines += _request_duration.render(ROUTE_LABELS)
+        lines += _request_statements.render(ROUTE_LABELS)
+        lines += _request_db_time.render(ROUTE_LABELS)
+        lines += _counter("db_statements_total", "SQL statements executed, by route.", ROUTE_LABELS, _statements_total)
+        lines += ["# HELP db_background_statements_total SQL statements outside requests (scheduler, startup).",
+                  "# TYPE db_background_statements_total counter",
+                  f"db_background_statements_total {_background['statements']}",
+                  "# HELP db_background_seconds_total Time spent in SQL outside requests.",
+                  "# TYPE db_background_seconds_total counter",
+                  f"db_background_seconds_total {_background['seconds']:.6f}"]
+
+    lines += ["# HELP db_pool_connections Connection pool usage by engine.", "# TYPE db_pool_connections gauge"]
+    for engine_name, pool in pool_stats().items():
+        for key in ("size", "checkedin", "checkedout", "overflow"):
+            if key in pool:
+                lines.append(f'db_pool_connections{{engine="{engine_name}",state="{key}"}} {pool[key]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,253 @@
+# migrations.py
+# Versioned schema migrations.
+# Each step runs once, in order, and is recorded in the `schema_version` table.
+# On boot an up-to-date database costs one catalog lookup plus one MAX(version) query.
+# Steps use SQLAlchemy's inspector instead of PRAGMA so they run on SQLite and Postgres.
+#
+# Usage: python migrations.py            -> apply pending steps
+#        python migrations.py status     -> show current / latest version
+
+from sqlalchemy import text, inspect
+from contextlib import contextmanager
+from datetime import datetime
+from database import engine, Base, DATA_DIR
+import os
+import sys
+import models
+
+SCHEMA_VERSION_TABLE = "schema_version"
+# Arbitrary constant used as the Postgres advisory lock key for migrations
+PG_LOCK_KEY = 74201
+BACKFILL_BATCH = 10000
+
+MIGRATIONS = []  # (version, description, fn(connection))
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+# --- Helpers for steps ---
+
+def add_missing_columns(connection, table: str, columns):
+    """columns: [(name, ddl_type)]. Only adds what the table lacks."""
+    existing = {c["name"] for c in inspect(connection).get_columns(table)}
+    for name, ddl in columns:
+        if name not in existing:
+            print(f"🔄 Migration: Adding '{name}' column to {table}...")
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+    connection.commit()
+
+
+def create_index(connection, name: str, table: str, expression: str, unique: bool = False):
+    """
+    CREATE INDEX IF NOT EXISTS. On Postgres the build is CONCURRENTLY (no write lock),
+    which has to run outside a transaction, so it gets its own autocommit connection.
+    """
+    unique_sql = "UNIQUE " if unique else ""
+    if connection.dialect.name == "postgresql":
+        connection.commit()
+        with connection.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as autocommit:
+            autocommit.execute(text(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({expression})"
+            ))
+    else:
+        connection.execute(text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({expression})"))
+        connection.commit()
+
+
+def drop_index(connection, name: str):
+    if connection.dialect.name == "postgresql":
+        connection.commit()
+        with connection.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as autocommit:
+            autocommit.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    else:
+        connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        connection.commit()
+
+
+# --- Steps ---
+
+@migration(1, "Base tables and legacy columns")
+def _base_schema(connection):
+    Base.metadata.create_all(bind=connection)
+    connection.commit()
+    add_missing_columns(connection, "tasks", [
+        ("is_pinned", "INTEGER DEFAULT 0"),
+        ("scheduled_date", "DATE"),
+        ("position", "FLOAT DEFAULT 0.0"),
+        ("scheduled_time", "VARCHAR"),
+    ])
+    add_missing_columns(connection, "users", [
+        ("email", "VARCHAR"),
+        ("password_hint", "VARCHAR"),
+        ("reset_token", "VARCHAR"),
+        ("reset_token_expiry", "TIMESTAMP"),
+    ])
+
+
+@migration(2, "Attachment references and inline attachment move to the blob store")
+def _attachments(connection):
+    from blob_store import migrate_inline_attachments
+
+    add_missing_columns(connection, "tasks", [
+        ("attachment_sha256", "VARCHAR(64)"),
+        ("attachment_type", "VARCHAR"),
+        ("attachment_size", "INTEGER"),
+    ])
+    create_index(connection, "ix_tasks_attachment_sha256", "tasks", "attachment_sha256")
+
+    columns = {c["name"] for c in inspect(connection).get_columns("tasks")}
+    if "attachment_data" in columns:
+        moved = migrate_inline_attachments(connection)
+        if moved:
+            print(f"🔄 Migration: Moved {moved} inline attachments to the blob store (VACUUM to reclaim space)")
+
+
+@migration(3, "Normalized task number index for duplicate detection")
+def _task_number_key(connection):
+    create_index(connection, "ix_tasks_task_number_key", "tasks", "lower(trim(task_number)), status")
+
+
+@migration(4, "Full-text search index")
+def _search(connection):
+    import search_index
+    search_index.setup(connection)
+
+
+@migration(5, "Task number counter")
+def _task_number_counter(connection):
+    from sequences import seed_task_number_counter
+    seed_task_number_counter(connection)
+
+
+@migration(6, "Composite indexes for the dashboard query shapes")
+def _query_indexes(connection):
+    # Must stay in step with Task.__table_args__; check_query_plans.py verifies they get used
+    create_index(connection, "ix_tasks_status_deadline", "tasks", "status, deadline_date, id")
+    create_index(connection, "ix_tasks_agency_status_deadline", "tasks", "assigned_agency, status, deadline_date")
+    create_index(connection, "ix_tasks_deadline", "tasks", "deadline_date, id")
+    create_index(connection, "ix_tasks_position_id", "tasks", "position, id")
+    create_index(connection, "ix_tasks_schedule", "tasks", "scheduled_date, scheduled_time")
+    create_index(connection, "ix_tasks_event_date", "tasks", "coalesce(scheduled_date, deadline_date)")
+    create_index(connection, "ix_tasks_updated_at", "tasks", "updated_at")
+    # Single-column indexes now covered by a composite prefix (or never filtered on)
+    for name in ("ix_tasks_status", "ix_tasks_assigned_agency", "ix_tasks_position",
+                 "ix_tasks_scheduled_date", "ix_tasks_is_pinned"):
+        drop_index(connection, name)
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("ANALYZE tasks"))
+        connection.commit()
+
+
+@migration(7, "Employee foreign key on tasks")
+def _task_employee(connection):
+    add_missing_columns(connection, "tasks", [
+        ("employee_id", "INTEGER REFERENCES employees(id) ON DELETE SET NULL"),
+    ])
+    # Backfill in id ranges so a large table isn't rewritten in one long transaction
+    max_id = connection.execute(text("SELECT MAX(id) FROM tasks")).scalar() or 0
+    linked = 0
+    for start in range(0, max_id + 1, BACKFILL_BATCH):
+        linked += connection.execute(text(
+            "UPDATE tasks SET employee_id = "
+            "(SELECT e.id FROM employees e WHERE e.display_name = tasks.assigned_agency) "
+            "WHERE id >= :lo AND id < :hi AND employee_id IS NULL AND assigned_agency IS NOT NULL "
+            "AND assigned_agency IN (SELECT display_name FROM employees)"
+        ), {"lo": start, "hi": start + BACKFILL_BATCH}).rowcount or 0
+        connection.commit()
+    print(f"🔄 Migration: Linked {linked} tasks to their employee")
+    create_index(connection, "ix_tasks_employee_status_deadline", "tasks", "employee_id, status, deadline_date")
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("ANALYZE tasks"))
+        connection.commit()
+
+
+# --- Runner ---
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(connection) -> int:
+    if not inspect(connection).has_table(SCHEMA_VERSION_TABLE):
+        return 0
+    return connection.execute(text(f"SELECT MAX(version) FROM {SCHEMA_VERSION_TABLE}")).scalar() or 0
+
+
+@contextmanager
+def _migration_lock(connection):
+    """Keeps several workers booting at once from running the same steps twice."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_lock(:k)"), {"k": PG_LOCK_KEY})
+        connection.commit()
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": PG_LOCK_KEY})
+            connection.commit()
+        return
+
+    try:
+        import fcntl
+    except ImportError:  # Windows dev machines: single process assumed
+        yield
+        return
+    with open(os.path.join(DATA_DIR, ".migrations.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def upgrade(db_engine=engine) -> int:
+    """Applies pending steps. Returns the schema version afterwards."""
+    with db_engine.connect() as connection:
+        version = current_version(connection)
+        connection.commit()
+        if version >= latest_version():
+            return version
+
+        with _migration_lock(connection):
+            # Another worker may have finished while we waited for the lock
+            version = current_version(connection)
+            if version == 0:
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} "
+                    f"(version INTEGER PRIMARY KEY, description VARCHAR, applied_at TIMESTAMP)"
+                ))
+            connection.commit()
+
+            for step_version, description, step in MIGRATIONS:
+                if step_version <= version:
+                    continue
+                print(f"🔄 Migration {step_version}: {description}")
+                try:
+                    step(connection)
+                    connection.execute(
+                        text(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description, applied_at) VALUES (:v, :d, :t)"),
+                        {"v": step_version, "d": description, "t": datetime.utcnow()},
+                    )
+                    connection.commit()
+                    version = step_version
+                except Exception as e:
+                    connection.rollback()
+                    print(f"❌ Migration {step_version} failed: {e}")
+                    break
+
+        if version >= latest_version():
+            print(f"✅ Migrations complete (schema version {version}).")
+        return version
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        with engine.connect() as conn:
+            print(f"Schema version {current_version(conn)} (latest {latest_version()})")
+    else:
+        upgrade()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Text, Float, DateTime
+from sqlalchemy import Column, Integer, String, Date, Text, Float, DateTime, Index, ForeignKey, func
 from database import Base
 import datetime
 
@@ -20,7 +20,9 @@ class Task(Base):
     task_number = Column(String, unique=True, index=True) # "Task/File No"
     
     description = Column(Text, nullable=True) # "Notes/Comments by Steno"
-    assigned_agency = Column(String, index=True, nullable=True) # "Assigned To"
+    assigned_agency = Column(String, nullable=True) # "Assigned To"
+    # Set when assigned_agency is an employee's display_name (see employee_directory.py)
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="SET NULL"), nullable=True)
     priority = Column(String, nullable=True)
     
     allocated_date = Column(Date, nullable=True) 
@@ -30,19 +32,43 @@ class Task(Base):
     # New Columns
     deadline_due_in = Column(String, nullable=True) # "Deadline due in"
     time_given = Column(String, nullable=True) # "Time given for task"
-    is_pinned = Column(Integer, default=0, index=True) # 0=False, 1=True
-    scheduled_date = Column(Date, nullable=True, index=True) # For Weekly Planner (Soft Schedule)
+    is_pinned = Column(Integer, default=0) # 0=False, 1=True
+    scheduled_date = Column(Date, nullable=True) # For Weekly Planner (Soft Schedule)
     scheduled_time = Column(String, nullable=True) # "HH:MM" 24hr format
-    position = Column(Float, default=0.0, index=True) # For manual ordering
+    position = Column(Float, default=0.0) # For manual ordering
 
-    status = Column(String, index=True, default="Pending") # Derived or Explicit
+    status = Column(String, default="Pending") # Derived or Explicit
     remarks = Column(Text, nullable=True)
-    attachment_data = Column(Text, nullable=True) # Base64 encoded image data
+    # Attachment bytes live in blob_store (content-addressed); the row only keeps the reference
+    attachment_sha256 = Column(String(64), nullable=True, index=True)
+    attachment_type = Column(String, nullable=True) # MIME type, e.g. "image/png"
+    attachment_size = Column(Integer, nullable=True) # Bytes
     
     source = Column(String, default="Sheet") # Sheet, Manual
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        # Normalized task number for duplicate detection (see duplicates.task_number_key)
+        Index("ix_tasks_task_number_key", func.lower(func.trim(task_number)), status),
+        # Composite indexes follow the dashboard query shapes (see check_query_plans.py);
+        # they replace the old single-column indexes on status/agency/position/scheduled_date.
+        # Status filter + deadline sort, and the daily rollover (status IN open statuses)
+        Index("ix_tasks_status_deadline", status, deadline_date, id),
+        # Agency (+ status) filter + deadline sort; also covers the per-agency stats GROUP BY
+        Index("ix_tasks_agency_status_deadline", assigned_agency, status, deadline_date),
+        # Same for employees, keyed by id; also the per-employee stats join
+        Index("ix_tasks_employee_status_deadline", employee_id, status, deadline_date),
+        # Unfiltered deadline / manual-order pages
+        Index("ix_tasks_deadline", deadline_date, id),
+        Index("ix_tasks_position_id", position, id),
+        # Weekly planner and the calendar feed date window
+        Index("ix_tasks_schedule", scheduled_date, scheduled_time),
+        Index("ix_tasks_event_date", func.coalesce(scheduled_date, deadline_date)),
+        # Calendar feed validator (MAX(updated_at))
+        Index("ix_tasks_updated_at", updated_at),
+    )
+
 class Employee(Base):
     __tablename__ = "employees"
     
@@ -51,3 +77,19 @@ class Employee(Base):
     mobile = Column(String, nullable=True)
     display_name = Column(String, unique=True, index=True, nullable=False) # e.g. "Aditya DMF"
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class Counter(Base):
+    __tablename__ = "counters"
+
+    name = Column(String, primary_key=True) # e.g. "task_number"
+    value = Column(Integer, nullable=False, default=0) # Last allocated value
+
+class TaskChange(Base):
+    __tablename__ = "task_changes"
+    # AUTOINCREMENT keeps versions strictly increasing even after old rows are pruned
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    version = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(Integer, nullable=False, index=True)
+    op = Column(String, nullable=False) # "upsert" | "delete"
+    changed_at = Column(DateTime, server_default=func.current_timestamp())
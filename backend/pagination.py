@@ -0,0 +1,34 @@
+from fastapi import HTTPException
+from datetime import date
+import base64
+import json
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(sort_key: str, value, row_id: int) -> str:
+    """Opaque keyset cursor: the sort key name, the last row's sort value and id."""
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([sort_key, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: str):
+    """Returns (value, id) for a cursor issued for the same sort key."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        row_id = int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if key != sort_key:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+
+    if sort_key.endswith("_date") and value is not None:
+        try:
+            value = date.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, row_id
@@ -0,0 +1,221 @@
+# response_cache.py
+# Shared cache for hot read endpoints (task list, stats, employees).
+# Entries are the encoded JSON body plus headers (including an ETag), keyed by route + normalized query params
+# + the current day (statuses roll over at midnight) + a per-namespace generation.
+# Writes bump the generation through task_events, so stale entries are never read again
+# and simply age out. Identical concurrent misses share one producer call (single flight).
+#
+# Backends: "memory" (default, per-process LRU with TTL) or "redis" (RESPONSE_CACHE_URL,
+# needs the optional `redis` package); with Redis the generations are shared by all workers.
+
+from collections import OrderedDict
+from datetime import date
+from urllib.parse import urlencode
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+import asyncio
+import hashlib
+import json
+import orjson
+import os
+import threading
+import time
+import task_events
+from static_files import etag_matches
+
+CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # memory | redis | off
+CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "redis://localhost:6379/0")
+DEFAULT_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 30))
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 512))
+KEY_PREFIX = "respcache"
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires, body, headers)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    def bump(self, namespace: str):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def set(self, key: str, body: bytes, headers: dict, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, body, headers)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        self._client.ping()
+
+    def generation(self, namespace: str) -> int:
+        return int(self._client.get(f"{KEY_PREFIX}:gen:{namespace}") or 0)
+
+    def bump(self, namespace: str):
+        self._client.incr(f"{KEY_PREFIX}:gen:{namespace}")
+
+    def get(self, key: str):
+        raw = self._client.get(key)
+        if raw is None:
+            return None
+        header_line, body = raw.split(b"\n", 1)
+        return body, json.loads(header_line)
+
+    def set(self, key: str, body: bytes, headers: dict, ttl: float):
+        self._client.set(key, json.dumps(headers).encode() + b"\n" + body, px=int(ttl * 1000))
+
+    def size(self) -> int:
+        return int(self._client.dbsize())
+
+
+def _make_backend():
+    if CACHE_BACKEND == "off":
+        return None
+    if CACHE_BACKEND == "redis":
+        try:
+            return RedisBackend(CACHE_URL)
+        except Exception as e:
+            print(f"⚠️ Response cache: Redis unavailable ({e}), using the in-process cache")
+    return MemoryBackend(MAX_ENTRIES)
+
+
+backend = _make_backend()
+_inflight = {}  # key -> asyncio.Future of the running producer
+_metrics_lock = threading.Lock()
+_metrics = {}  # namespace -> {"hits", "misses", "coalesced", "errors"}
+
+
+def _count(namespace: str, metric: str):
+    with _metrics_lock:
+        counts = _metrics.setdefault(namespace, {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0})
+        counts[metric] += 1
+
+
+@task_events.subscribe
+def invalidate(topic, action, ids, rows=None):
+    if backend is not None:
+        backend.bump(topic)
+
+
+def make_key(namespace: str, route: str, params: dict, generation: int, list_params=()) -> str:
+    """
+    Normalizes params: drops empty values, sorts keys, and sorts comma-separated
+    values of `list_params` so `agency=B,A` and `agency=A,B` share an entry.
+    """
+    normalized = []
+    for name, value in params.items():
+        if value is None or value == "":
+            continue
+        if name in list_params and isinstance(value, str):
+            value = ",".join(sorted({part.strip() for part in value.split(",") if part.strip()}))
+        normalized.append((name, str(value)))
+    raw = f"{route}?{urlencode(sorted(normalized))}|{date.today().isoformat()}"
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"{KEY_PREFIX}:{namespace}:{generation}:{digest}"
+
+
+def _with_etag(body: bytes, headers: dict):
+    return body, {**headers, "ETag": f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'}
+
+
+async def get_or_produce(namespace: str, route: str, params: dict, produce, ttl: float = None, list_params=()):
+    """
+    Returns (body, headers). `produce` is an async callable returning (body, headers);
+    it only runs on a miss, and at most once per key at a time in this process.
+    """
+    if backend is None:
+        return _with_etag(*await produce())
+
+    try:
+        key = make_key(namespace, route, params, backend.generation(namespace), list_params)
+        cached = backend.get(key)
+    except Exception as e:
+        print(f"⚠️ Response cache read failed: {e}")
+        _count(namespace, "errors")
+        return _with_etag(*await produce())
+    if cached is not None:
+        _count(namespace, "hits")
+        return cached
+
+    running = _inflight.get(key)
+    if running is not None:
+        _count(namespace, "coalesced")
+        return await asyncio.shield(running)
+
+    _count(namespace, "misses")
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        body, headers = _with_etag(*await produce())
+        try:
+            backend.set(key, body, headers, ttl or DEFAULT_TTL_SECONDS)
+        except Exception as e:
+            print(f"⚠️ Response cache write failed: {e}")
+            _count(namespace, "errors")
+        future.set_result((body, headers))
+        return body, headers
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody else was waiting
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+def encode(payload) -> bytes:
+    """orjson handles dicts/lists of primitives, dates and datetimes natively."""
+    return orjson.dumps(payload, default=jsonable_encoder)
+
+
+def to_response(body: bytes, headers: dict, request: Request = None) -> Response:
+    """JSON response for a cached entry; 304 when the client already holds this body."""
+    if request is not None:
+        if etag_matches(request.headers.get("if-none-match", ""), headers.get("ETag")):
+            return Response(status_code=304, headers={"ETag": headers["ETag"], "Cache-Control": "no-cache"})
+    # no-cache: browsers keep the body and revalidate with If-None-Match
+    return Response(content=body, media_type="application/json", headers={**headers, "Cache-Control": "no-cache"})
+
+
+def stats() -> dict:
+    """Hit/miss counters for /health."""
+    with _metrics_lock:
+        namespaces = {name: dict(counts) for name, counts in _metrics.items()}
+    for counts in namespaces.values():
+        lookups = counts["hits"] + counts["misses"] + counts["coalesced"]
+        counts["hit_ratio"] = round((counts["hits"] + counts["coalesced"]) / lookups, 3) if lookups else None
+    try:
+        entries = backend.size() if backend is not None else 0
+    except Exception:
+        entries = None
+    return {"backend": backend.name if backend is not None else "off", "entries": entries, "namespaces": namespaces}
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db
 import models
 from pydantic import BaseModel
 
-from jose import jwt
 from datetime import datetime, timedelta
 import secrets
 import os
@@ -15,11 +15,11 @@ from email.mime.multipart import MIMEMultipart
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 # --- Security Config ---
-SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key-change-me")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 1 day
-
-
+# Token settings and the current_user dependency live in security.py
+from security import (
+    create_access_token, current_user, TokenUser,
+    login_retry_after, record_login_failure, clear_login_failures,
+)
 
 # --- Schemas ---
 class LoginRequest(BaseModel):
@@ -36,26 +36,38 @@ class ResetPasswordRequest(BaseModel):
 class HintResponse(BaseModel):
     hint: str
 
-from utils import verify_password, get_password_hash
-
-def create_access_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+from utils import verify_password_async, get_password_hash_async, HashingBusy
 
 # --- Endpoints ---
 
+def _busy():
+    return HTTPException(status_code=503, detail="Too many logins in progress, try again shortly",
+                         headers={"Retry-After": "1"})
+
 @router.post("/login")
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.username == request.username).first()
-    if not user:
-        raise HTTPException(status_code=400, detail="Invalid username or password")
-    
-    if not verify_password(request.password, user.hashed_password):
+async def login(request: LoginRequest, http_request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Async so the (deliberately slow) hash check runs on the password pool, not a request thread.
+    Repeated failures for one username from one client get 429 for LOGIN_WINDOW_SECONDS.
+    """
+    client = http_request.client.host if http_request.client else "unknown"
+    retry_after = login_retry_after(client, request.username)
+    if retry_after:
+        raise HTTPException(status_code=429, detail="Too many failed attempts, try again later",
+                            headers={"Retry-After": str(retry_after)})
+
+    user = await db.run_sync(
+        lambda session: session.query(models.User).filter(models.User.username == request.username).first()
+    )
+    try:
+        valid = bool(user) and await verify_password_async(request.password, user.hashed_password)
+    except HashingBusy:
+        raise _busy()
+    if not valid:
+        record_login_failure(client, request.username)
         raise HTTPException(status_code=400, detail="Invalid username or password")
-    
+    clear_login_failures(client, request.username)
+
     access_token = create_access_token(data={"sub": user.username, "role": user.role})
     return {
         "access_token": access_token,
@@ -67,6 +79,11 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
         }
     }
 
+@router.get("/me", response_model=TokenUser)
+def read_current_user(user: TokenUser = Depends(current_user)):
+    """The caller as seen from their token (no database lookup)."""
+    return user
+
 @router.get("/hint/{username}")
 def get_hint(username: str, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.username == username).first()
@@ -153,8 +170,10 @@ def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db
     return {"message": "If this email is registered, a reset link has been sent."}
 
 @router.post("/reset-password")
-def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.reset_token == request.token).first()
+async def reset_password(request: ResetPasswordRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await db.run_sync(
+        lambda session: session.query(models.User).filter(models.User.reset_token == request.token).first()
+    )
     if not user:
         raise HTTPException(status_code=400, detail="Invalid token")
     
@@ -162,9 +181,12 @@ def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db))
         raise HTTPException(status_code=400, detail="Token expired")
     
     # Reset
-    user.hashed_password = get_password_hash(request.new_password)
+    try:
+        user.hashed_password = await get_password_hash_async(request.new_password)
+    except HashingBusy:
+        raise _busy()
     user.reset_token = None
     user.reset_token_expiry = None
-    db.commit()
+    await db.commit()
 
     return {"message": "Password updated successfully"}
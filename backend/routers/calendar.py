@@ -1,72 +1,186 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 import models
-from ics import Calendar, Event
-from datetime import datetime, timedelta
+import task_events
+import employee_directory
+from static_files import etag_matches
+from typing import Optional
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+import re
+import threading
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# --- ICS serialization ---
+# Bump when the event format changes so clients drop their cached copies
+FEED_FORMAT_VERSION = "2"
+CALENDAR_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Task Dashboard//Task Feed//EN\r\nCALSCALE:GREGORIAN\r\n"
+CALENDAR_FOOTER = "END:VCALENDAR\r\n"
+FEED_CHUNK_EVENTS = 500
+TIME_RE = re.compile(r"^([01]?\d|2[0-3]):([0-5]\d)$")
+
+FEED_COLUMNS = [
+    models.Task.id,
+    models.Task.task_number,
+    models.Task.assigned_agency,
+    models.Task.description,
+    models.Task.priority,
+    models.Task.status,
+    models.Task.deadline_date,
+    models.Task.scheduled_date,
+    models.Task.scheduled_time,
+    models.Task.updated_at,
+]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+def _fold(line: str) -> str:
+    """RFC 5545 line folding at 75 octets."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Don't split a multi-byte character
+        while cut > 0 and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+def serialize_event(task) -> str:
+    lines = ["BEGIN:VEVENT", f"UID:task-{task.id}@task-dashboard"]
+    stamp = task.updated_at or datetime.utcnow()
+    lines.append(f"DTSTAMP:{stamp.strftime('%Y%m%dT%H%M%SZ')}")
+
+    # Use scheduled date if available, else deadline
+    date_only = task.scheduled_date or task.deadline_date
+    time_match = TIME_RE.match(task.scheduled_time.strip()) if task.scheduled_date and task.scheduled_time else None
+    if time_match:
+        hour, minute = int(time_match.group(1)), int(time_match.group(2))
+        lines.append(f"DTSTART:{task.scheduled_date.strftime('%Y%m%d')}T{hour:02d}{minute:02d}00")
+    else:
+        lines.append(f"DTSTART;VALUE=DATE:{date_only.strftime('%Y%m%d')}")
+
+    lines.append("SUMMARY:" + _escape(f"#{task.task_number} {task.assigned_agency or ''}"))
+
+    description_lines = []
+    if task.description:
+        description_lines.append(f"Description: {task.description}")
+    if task.priority:
+        description_lines.append(f"Priority: {task.priority}")
+    if task.status:
+        description_lines.append(f"Status: {task.status}")
+    if description_lines:
+        lines.append("DESCRIPTION:" + _escape("\n".join(description_lines)))
+
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+# --- Fragment cache ---
+# task id -> (updated_at, status, serialized VEVENT). Entries are also checked against the
+# row's updated_at, so changes made by another worker are picked up without a signal.
+_fragments = {}
+_fragments_lock = threading.Lock()
+
+@task_events.subscribe
+def invalidate_fragments(topic, action, ids, rows=None):
+    if topic != "tasks":
+        return
+    with _fragments_lock:
+        if ids is None:
+            _fragments.clear()
+        else:
+            for task_id in ids:
+                _fragments.pop(task_id, None)
+
+def get_fragment(task) -> str:
+    key = (task.updated_at, task.status)
+    cached = _fragments.get(task.id)
+    if cached and cached[0] == key:
+        return cached[1]
+    fragment = serialize_event(task)
+    with _fragments_lock:
+        _fragments[task.id] = (key, fragment)
+    return fragment
+
+# --- Routes ---
+
+def _feed_query(db: Session, columns, agency: Optional[str], start: Optional[date], end: Optional[date]):
+    event_date = func.coalesce(models.Task.scheduled_date, models.Task.deadline_date)
+    query = db.query(*columns).filter(
+        (models.Task.deadline_date != None) | (models.Task.scheduled_date != None)
+    )
+    if agency:
+        query = query.filter(employee_directory.agency_condition(db, agency))
+    if start:
+        query = query.filter(event_date >= start)
+    if end:
+        query = query.filter(event_date <= end)
+    return query
 
 @router.get("/feed", tags=["calendar"])
-def get_calendar_feed(db: Session = Depends(get_db)):
+async def get_calendar_feed(
+    request: Request,
+    agency: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Generates an ICS calendar feed of all tasks with a deadline or scheduled date.
+    ICS feed of all tasks with a deadline or scheduled date.
+    Optional filters: `agency` (comma separated), `start`/`end` on the event date.
+    Supports conditional GET via ETag / Last-Modified.
     """
     try:
-        tasks = db.query(models.Task).filter((models.Task.deadline_date != None) | (models.Task.scheduled_date != None)).all()
-        
-        c = Calendar()
-        
-        for task in tasks:
-            e = Event()
-            e.name = f"#{task.task_number} {task.assigned_agency or ''}"
-            
-            # Use scheduled date if available, else deadline
-            date_only = task.scheduled_date or task.deadline_date
-            
-            if date_only:
-                if task.scheduled_date and task.scheduled_time:
-                    # Specific Time
-                    try:
-                        # Combine Date + Time
-                        dt_str = f"{task.scheduled_date.strftime('%Y-%m-%d')} {task.scheduled_time}"
-                        # Parse
-                        e.begin = dt_str # ics library handles ISO-like strings often, or use datetime object
-                        # Let's use arrow or datetime to be safe
-                        # e.begin = datetime.strptime(dt_str, '%Y-%m-%d %H:%M')
-                        # The ics library is smart.
-                    except:
-                        e.begin = date_only.strftime('%Y-%m-%d')
-                        e.make_all_day()
-                else:
-                    # All day event
-                    e.begin = date_only.strftime('%Y-%m-%d')
-                    e.make_all_day()
-            
-            description_lines = []
-            if task.description:
-                description_lines.append(f"Description: {task.description}")
-            if task.priority:
-                description_lines.append(f"Priority: {task.priority}")
-            if task.status:
-                description_lines.append(f"Status: {task.status}")
-                
-            e.description = "\n".join(description_lines)
-            
-            # Add URL if needed (e.g. deep link to task dashboard)
-            # e.url = f"http://localhost:5173/task/{task.id}" 
-            
-            c.events.add(e)
-            
-        return Response(content=str(c), media_type="text/calendar")
-        
+        # Cheap validator first: anything that changes the feed moves one of these
+        validator_columns = [func.count(models.Task.id), func.max(models.Task.updated_at), func.max(models.Task.id)]
+        count, last_updated, max_id = await db.run_sync(
+            lambda session: _feed_query(session, validator_columns, agency, start, end).one()
+        )
+
+        validator = f"{FEED_FORMAT_VERSION}|{count}|{last_updated}|{max_id}|{agency}|{start}|{end}"
+        etag = f'W/"{hashlib.sha1(validator.encode()).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        last_modified = None
+        if last_updated:
+            last_modified = last_updated.replace(microsecond=0, tzinfo=timezone.utc)
+            headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers=headers)
+        elif last_modified and request.headers.get("if-modified-since"):
+            try:
+                if last_modified <= parsedate_to_datetime(request.headers["if-modified-since"]):
+                    return Response(status_code=304, headers=headers)
+            except (TypeError, ValueError):
+                pass
+
+        tasks = await db.run_sync(
+            lambda session: _feed_query(session, FEED_COLUMNS, agency, start, end).order_by(models.Task.id).all()
+        )
+
+        def generate():
+            # StreamingResponse runs each next() of a sync generator on the threadpool:
+            # yield a few hundred events per hop, not one
+            yield CALENDAR_HEADER
+            for offset in range(0, len(tasks), FEED_CHUNK_EVENTS):
+                yield "".join(get_fragment(task) for task in tasks[offset:offset + FEED_CHUNK_EVENTS])
+            yield CALENDAR_FOOTER
+
+        return StreamingResponse(generate(), media_type="text/calendar", headers=headers)
+
     except Exception as e:
         print(f"Calendar Feed Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db
 import models
+import task_events
+import response_cache
+import employee_directory
 from pydantic import BaseModel
 from typing import Optional, List
 
@@ -30,8 +35,13 @@ class EmployeeOut(EmployeeBase):
 # --- Routes ---
 
 @router.get("/", response_model=List[EmployeeOut])
-def get_employees(db: Session = Depends(get_db)):
-    return db.query(models.Employee).all()
+async def get_employees(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def produce():
+        result = await db.execute(select(models.Employee))
+        return response_cache.encode([EmployeeOut.model_validate(e).model_dump() for e in result.scalars()]), {}
+
+    body, headers = await response_cache.get_or_produce("employees", "employees.list", {}, produce)
+    return response_cache.to_response(body, headers, request)
 
 @router.post("/", response_model=EmployeeOut)
 def create_employee(employee: EmployeeCreate, db: Session = Depends(get_db)):
@@ -42,8 +52,14 @@ def create_employee(employee: EmployeeCreate, db: Session = Depends(get_db)):
     
     db_emp = models.Employee(**employee.dict())
     db.add(db_emp)
+    db.flush()
+    # Tasks already assigned to this name (e.g. from the sheet) get linked
+    linked = employee_directory.link_tasks(db, db_emp.id, db_emp.display_name)
     db.commit()
     db.refresh(db_emp)
+    task_events.publish("employees", "create", [db_emp.id], [EmployeeOut.model_validate(db_emp).model_dump()])
+    if linked:
+        task_events.publish("tasks", "employee_link", None)
     return db_emp
 
 @router.put("/{emp_id}", response_model=EmployeeOut)
@@ -61,9 +77,18 @@ def update_employee(emp_id: int, update: EmployeeUpdate, db: Session = Depends(g
     data = update.dict(exclude_unset=True)
     for key, value in data.items():
         setattr(emp, key, value)
+
+    changed_tasks = 0
+    if "display_name" in data:
+        # Renames carry over to the employee's tasks instead of orphaning them
+        changed_tasks = employee_directory.rename_tasks(db, emp.id, emp.display_name)
+        changed_tasks += employee_directory.link_tasks(db, emp.id, emp.display_name)
     
     db.commit()
     db.refresh(emp)
+    task_events.publish("employees", "update", [emp.id], [EmployeeOut.model_validate(emp).model_dump()])
+    if changed_tasks:
+        task_events.publish("tasks", "employee_rename", None)
     return emp
 
 @router.delete("/{emp_id}")
@@ -72,8 +97,13 @@ def delete_employee(emp_id: int, db: Session = Depends(get_db)):
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
     
+    # Tasks keep the agency text; only the link goes (SQLite doesn't enforce ON DELETE SET NULL)
+    unlinked = employee_directory.unlink_tasks(db, emp_id)
     db.delete(emp)
     db.commit()
+    task_events.publish("employees", "delete", [emp_id])
+    if unlinked:
+        task_events.publish("tasks", "employee_unlink", None)
     return {"message": "Deleted"}
 
 
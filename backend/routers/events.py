@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+import event_stream
+
+router = APIRouter()
+
+HEARTBEAT_SECONDS = 15
+
+@router.get("/stream")
+async def stream_events(request: Request):
+    """
+    Server-Sent Events stream of task and employee changes.
+    Events are named "tasks" / "employees" with data {"action", "ids", "rows"}.
+    Clients should reload everything on connect and on a "resync" action.
+    """
+    client = event_stream.connect()
+    _, queue = client
+
+    async def generate():
+        try:
+            yield "retry: 3000\n\n"
+            yield event_stream.format_message("hello", {"action": "connected"})
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                    yield message
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+        finally:
+            event_stream.disconnect(client)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=headers)
@@ -1,10 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import FileResponse
+from sqlalchemy import func, case, update, and_, or_
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, run_in_session
 import models
+import blob_store
+import search_index
+import task_events
+import sequences
+import duplicates
+import change_log
+import response_cache
+import employee_directory
+from static_files import etag_matches
+from status_engine import (
+    OPEN_STATUSES, format_deadline_due_in, sync_task_status, sync_statuses, sync_deadlines_due_in,
+    ensure_statuses_current,
+)
+from pagination import encode_cursor, decode_cursor, MAX_PAGE_SIZE
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import date
+from datetime import date, datetime
 import os
 
 router = APIRouter()
@@ -19,7 +35,6 @@ class TaskCreate(BaseModel):
     deadline_date: Optional[date] = None
     status: Optional[str] = "Pending"
     remarks: Optional[str] = None
-    deadline_due_in: Optional[str] = None
     time_given: Optional[str] = None
     is_pinned: Optional[bool] = False
     scheduled_date: Optional[date] = None
@@ -32,7 +47,6 @@ class TaskUpdate(BaseModel):
     status: Optional[str] = None
     remarks: Optional[str] = None
     completion_date: Optional[str] = None
-    deadline_due_in: Optional[str] = None
     time_given: Optional[str] = None
     deadline_date: Optional[date] = None
     is_pinned: Optional[bool] = None
@@ -49,134 +63,360 @@ class TaskBulkUpdateItem(BaseModel):
     deadline_date: Optional[date] = None
     status: Optional[str] = None
     remarks: Optional[str] = None
-    deadline_due_in: Optional[str] = None
     time_given: Optional[str] = None
     is_pinned: Optional[bool] = None
     scheduled_date: Optional[date] = None
     scheduled_time: Optional[str] = None
     completion_date: Optional[str] = None
+    position: Optional[float] = None
+    # Optimistic concurrency: the updated_at the client last saw; mismatches are rejected
+    updated_at: Optional[datetime] = None
 
 class TaskBulkUpdateList(BaseModel):
     updates: List[TaskBulkUpdateItem]
 
+class TaskOut(BaseModel):
+    id: int
+    task_number: Optional[str] = None
+    description: Optional[str] = None
+    assigned_agency: Optional[str] = None
+    employee_id: Optional[int] = None
+    priority: Optional[str] = None
+    allocated_date: Optional[date] = None
+    deadline_date: Optional[date] = None
+    completion_date: Optional[str] = None
+    deadline_due_in: Optional[str] = None
+    time_given: Optional[str] = None
+    is_pinned: Optional[int] = None
+    scheduled_date: Optional[date] = None
+    scheduled_time: Optional[str] = None
+    position: Optional[float] = None
+    status: Optional[str] = None
+    remarks: Optional[str] = None
+    attachment_sha256: Optional[str] = None
+    attachment_type: Optional[str] = None
+    attachment_size: Optional[int] = None
+    source: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class TaskListItem(TaskOut):
+    """A task row as listed; with `fields=` only the requested keys (plus id) are present."""
+    pass
+
+class TaskChangesOut(BaseModel):
+    version: int
+    has_more: bool
+    reset: bool
+    upserts: List[TaskListItem]
+    deleted: List[int]
+
+class DuplicateTask(BaseModel):
+    id: int
+    task_number: Optional[str] = None
+    description: Optional[str] = None
+    assigned_agency: Optional[str] = None
+    deadline_date: Optional[date] = None
+    status: Optional[str] = None
+    source: Optional[str] = None
+    created_at: Optional[datetime] = None
+
 # --- Helper ---
-def sync_task_status(task):
-    if task.completion_date and str(task.completion_date).strip():
-        task.status = "Completed"
-    else:
-        if task.deadline_date and task.deadline_date < date.today():
-            task.status = "Overdue"
+TASK_COLUMN_NAMES = [column.name for column in models.Task.__table__.columns]
+TASK_FIELDS = set(TASK_COLUMN_NAMES)
+KEYSET_SORTS = ("deadline_date", "position")
+PAGE_HEADERS = ("X-Total-Count", "X-Next-Cursor")
+BULK_CHUNK_SIZE = 500
+
+def task_to_dict(task) -> dict:
+    return {name: getattr(task, name) for name in TASK_COLUMN_NAMES}
+
+def parse_fields(fields: Optional[str]):
+    """Validates a `fields=` projection; `id` is always included."""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [n for n in names if n not in TASK_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if "id" not in names:
+        names.insert(0, "id")
+    return names
+
+def apply_task_filters(query, agency: Optional[str], status: Optional[str], search: Optional[str]):
+    """Returns (query, search_rank); search_rank is None unless a full-text search ran."""
+    if agency:
+        # Employees match on employee_id; free-text agencies on the name
+        query = query.filter(employee_directory.agency_condition(query.session, agency))
+
+    if status:
+        if ',' in status:
+            status_list = [s.strip() for s in status.split(',')]
+            query = query.filter(models.Task.status.in_(status_list))
         else:
-            task.status = "Pending"
+            query = query.filter(models.Task.status == status)
 
-def refresh_all_task_statuses(db: Session):
-    """Updates status for all non-completed tasks based on today's date."""
-    tasks_to_refresh = db.query(models.Task).filter(models.Task.status.in_(["Pending", "Overdue"])).all()
-    for task in tasks_to_refresh:
-        sync_task_status(task)
+    search_rank = None
+    if search and search.strip():
+        query, search_rank = search_index.apply_search(query, search.strip())
+    return query, search_rank
+
+def apply_keyset(query, sort_key: str, cursor: Optional[str]):
+    """Orders by (sort_key, id) and seeks past the cursor row. Deadlines sort NULLs last."""
+    task_id = models.Task.id
+    if sort_key == "deadline_date":
+        column = models.Task.deadline_date
+        query = query.order_by(column.asc().nulls_last(), task_id.asc())
+    elif sort_key == "position":
+        column = models.Task.position
+        query = query.order_by(column.asc(), task_id.asc())
+    else:
+        column = None
+        query = query.order_by(task_id.asc())
+
+    if not cursor:
+        return query
+
+    value, last_id = decode_cursor(cursor, sort_key)
+    if column is None:
+        return query.filter(task_id > last_id)
+    if value is None:
+        # Only reachable for deadlines: we are already inside the trailing NULL block
+        return query.filter(column.is_(None), task_id > last_id)
+
+    after = or_(column > value, and_(column == value, task_id > last_id))
+    if sort_key == "deadline_date":
+        after = or_(after, column.is_(None))
+    return query.filter(after)
+
+# --- Stats ---
+STATS_TTL_SECONDS = float(os.getenv("STATS_TTL_SECONDS", 30))
+
+def stats_queries(db: Session):
+    """
+    Per-agency counts by status, as two grouped queries:
+    employees joined on employee_id (ix_tasks_employee_status_deadline), and tasks whose
+    agency is free text grouped by name (ix_tasks_agency_status_deadline).
+    """
+    status_col = models.Task.status
+    def counts():
+        return [func.count(models.Task.id)] + [
+            func.coalesce(func.sum(case((status_col == name, 1), else_=0)), 0)
+            for name in ("Pending", "Overdue", "Completed")
+        ]
+
+    by_employee = db.query(models.Employee.display_name, *counts()) \
+        .join(models.Task, models.Task.employee_id == models.Employee.id) \
+        .group_by(models.Employee.id, models.Employee.display_name)
+    by_name = db.query(models.Task.assigned_agency, *counts()) \
+        .filter(models.Task.employee_id.is_(None)) \
+        .group_by(models.Task.assigned_agency)
+    return by_employee, by_name
+
+def compute_stats(db: Session):
+    """Totals, per-status and per-agency-per-status counts."""
+    by_employee, by_name = stats_queries(db)
+    rows = sorted(by_employee.all() + by_name.all(), key=lambda row: row[0] or "")
+
+    total = completed = overdue = pending_only = 0
+    by_agency = []
+    for agency, count, a_pending, a_overdue, a_completed in rows:
+        total += count
+        pending_only += a_pending
+        overdue += a_overdue
+        completed += a_completed
+        if agency:
+            by_agency.append({
+                "name": agency,
+                "count": count,
+                "pending": a_pending,
+                "overdue": a_overdue,
+                "completed": a_completed,
+            })
+
+    return {
+        "total": total,
+        "completed": completed,
+        "overdue": overdue,
+        "pending": total - completed,
+        "by_status": {"Pending": pending_only, "Overdue": overdue, "Completed": completed},
+        "by_agency": by_agency,
+    }
 
 # --- Routes ---
 
-@router.get("/")
-def get_tasks(
+@router.get("/", response_model=List[TaskListItem])
+async def get_tasks(
+    request: Request,
     agency: Optional[str] = None,
     status: Optional[str] = None,
     search: Optional[str] = None,
     sort_by: Optional[str] = "deadline_date",
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ):
-    refresh_all_task_statuses(db)
-    db.commit()
-    query = db.query(models.Task)
-
-    if agency:
-        if ',' in agency:
-            agency_list = [a.strip() for a in agency.split(',')]
-            query = query.filter(models.Task.assigned_agency.in_(agency_list))
-        else:
-            query = query.filter(models.Task.assigned_agency == agency)
-
-    if status:
-        if ',' in status:
-            status_list = [s.strip() for s in status.split(',')]
-            query = query.filter(models.Task.status.in_(status_list))
-        else:
-            query = query.filter(models.Task.status == status)
-
-    if search:
-        query = query.filter(
-            models.Task.description.contains(search) | models.Task.task_number.contains(search)
-        )
+    """
+    Lists tasks. Without `limit` the whole filtered list is returned (legacy behaviour).
+    With `limit`, results are keyset-paginated: pass back `X-Next-Cursor` as `cursor`.
+    `X-Total-Count` is only computed for the first page.
+    `sort_by=relevance` ranks search hits; it returns the top `limit` rows without a cursor.
+    """
+    params = {"agency": agency, "status": status, "search": search and search.strip(), "sort_by": sort_by,
+              "limit": limit, "cursor": cursor, "fields": fields}
+
+    async def produce():
+        # 20k-row unfiltered lists take a while to build and encode: keep that off the event loop
+        return await run_in_session(encode_task_list, agency, status, search, sort_by, limit, cursor, fields)
+
+    body, headers = await response_cache.get_or_produce(
+        "tasks", "tasks.list", params, produce, list_params=("agency", "status", "fields")
+    )
+    return response_cache.to_response(body, headers, request)
+
+def encode_task_list(db: Session, *args):
+    """list_tasks as (encoded body, page headers)."""
+    page_headers = Response()
+    rows = list_tasks(db, page_headers, *args)
+    headers = {name: page_headers.headers[name] for name in PAGE_HEADERS if name in page_headers.headers}
+    return response_cache.encode(rows), headers
+
+def list_tasks(db: Session, response: Response, agency, status, search, sort_by, limit, cursor, fields):
+    ensure_statuses_current(db)
+    field_names = parse_fields(fields)
+    sort_key = sort_by if sort_by in KEYSET_SORTS else "id"
+
+    query, search_rank = apply_task_filters(db.query(models.Task), agency, status, search)
+    by_relevance = sort_by == "relevance" and search_rank is not None
+    if by_relevance and cursor:
+        raise HTTPException(status_code=400, detail="Relevance ordering does not support cursors")
+
+    if limit is not None and not cursor:
+        total = query.with_entities(func.count(models.Task.id)).scalar()
+        response.headers["X-Total-Count"] = str(total)
+
+    # Plain column tuples, never ORM instances: no identity map, and rows encode as dicts directly
+    field_names = field_names or TASK_COLUMN_NAMES
+    select_names = field_names if sort_key in field_names else field_names + [sort_key]
+    query = query.with_entities(*[getattr(models.Task, name) for name in select_names])
+
+    if by_relevance:
+        query = query.order_by(search_rank, models.Task.id)
+    else:
+        query = apply_keyset(query, sort_key, cursor)
 
-    if sort_by == "deadline_date":
-        query = query.order_by(models.Task.deadline_date.asc())
+    if limit is None:
+        rows = query.all()
+    elif by_relevance:
+        rows = query.limit(limit).all()
+    else:
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(sort_key, getattr(last, sort_key), last.id)
 
-    return query.all()
+    return [dict(zip(field_names, row)) for row in rows]
 
 @router.get("/stats")
-def get_stats(db: Session = Depends(get_db)):
-    refresh_all_task_statuses(db)
-    db.commit()
-    total = db.query(models.Task).count()
-    completed = db.query(models.Task).filter(models.Task.status == "Completed").count()
-    overdue = db.query(models.Task).filter(models.Task.status == "Overdue").count()
-    pending = total - completed
+async def get_stats(request: Request):
+    """Served from the response cache; task writes drop it immediately."""
+    async def produce():
+        return await run_in_session(refresh_stats), {}
 
-    from sqlalchemy import func
-    agency_stats = db.query(models.Task.assigned_agency, func.count(models.Task.id))\
-        .group_by(models.Task.assigned_agency).all()
+    body, headers = await response_cache.get_or_produce("tasks", "tasks.stats", {}, produce, ttl=STATS_TTL_SECONDS)
+    return response_cache.to_response(body, headers, request)
 
-    return {
-        "total": total,
-        "completed": completed,
-        "overdue": overdue,
-        "pending": pending,
-        "by_agency": [{"name": a, "count": c} for a, c in agency_stats if a]
-    }
+def refresh_stats(db: Session) -> bytes:
+    ensure_statuses_current(db)
+    return response_cache.encode(compute_stats(db))
 
-@router.post("/")
+@router.post("/", response_model=TaskOut)
 def create_task(task: TaskCreate, db: Session = Depends(get_db)):
-    # Auto-generate Task Number if missing
-    if not task.task_number:
-        existing_tasks = db.query(models.Task.task_number).all()
-        max_num = 0
-        for t in existing_tasks:
-            t_num = t.task_number
-            if t_num and t_num.startswith("Task "):
-                try:
-                    num = int(t_num.replace("Task ", ""))
-                    if num > max_num:
-                        max_num = num
-                except:
-                    pass
-        task.task_number = f"Task {max_num + 1}"
-
-    db_task = models.Task(**task.dict(), source="Manual")
+    task_data = task.dict()
+    attachment_data = task_data.pop("attachment_data", None)
+    db_task = models.Task(**task_data, source="Manual")
+    db_task.employee_id = employee_directory.resolve_id(db, db_task.assigned_agency)
+    if attachment_data:
+        # Legacy clients still post base64 inline; store it as a blob instead
+        try:
+            content_type, raw = blob_store.decode_data_url(attachment_data)
+            db_task.attachment_sha256, db_task.attachment_size = blob_store.put_bytes(raw)
+            db_task.attachment_type = content_type
+        except (ValueError, blob_store.BlobTooLarge) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if db_task.status in OPEN_STATUSES:
+        sync_task_status(db_task)
+    else:
+        db_task.deadline_due_in = format_deadline_due_in(db_task.completion_date, db_task.deadline_date)
     try:
+        # Auto-generate Task Number if missing (allocated in this transaction)
+        if not db_task.task_number:
+            db_task.task_number = sequences.next_task_number(db)
         db.add(db_task)
+        db.flush()
+        change_log.record(db, [db_task.id])
         db.commit()
         db.refresh(db_task)
+        task_events.publish("tasks", "create", [db_task.id], [task_to_dict(db_task)])
         return db_task
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Error creating task: {str(e)}")
 
-@router.get("/duplicates")
-def get_duplicate_tasks(db: Session = Depends(get_db)):
-    all_tasks = db.query(models.Task).filter(models.Task.status != "Deleted").all()
-    groups = {}
-    for task in all_tasks:
-        if not task.task_number:
-            continue
-        key = task.task_number.strip().lower()
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(task)
-
-    duplicates = [tasks for k, tasks in groups.items() if len(tasks) > 1]
-    return duplicates
+@router.get("/changes", response_model=TaskChangesOut, response_model_exclude_unset=True)
+def get_task_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Delta sync. Returns tasks inserted/updated and ids deleted after change `version` `since`.
+    Store the returned `version` and pass it back next time; repeat while `has_more`.
+    `reset` means the log no longer reaches back that far: reload the full list instead.
+    """
+    return list_task_changes(db, since, limit, fields)
+
+def list_task_changes(db: Session, since: int, limit: int, fields: Optional[str]):
+    ensure_statuses_current(db)
+    field_names = parse_fields(fields) or TASK_COLUMN_NAMES
+    task_ids, version, has_more, reset = change_log.changes_since(db, since, limit)
+
+    upserts = []
+    for start in range(0, len(task_ids), BULK_CHUNK_SIZE):
+        chunk = task_ids[start:start + BULK_CHUNK_SIZE]
+        rows = db.query(*[getattr(models.Task, name) for name in field_names])\
+            .filter(models.Task.id.in_(chunk)).all()
+        upserts.extend({name: getattr(row, name) for name in field_names} for row in rows)
+
+    present = {row["id"] for row in upserts}
+    return {
+        "version": version,
+        "has_more": has_more,
+        "reset": reset,
+        "upserts": upserts,
+        "deleted": [task_id for task_id in task_ids if task_id not in present],
+    }
 
-@router.put("/{task_id}")
+@router.get("/duplicates", response_model=List[List[DuplicateTask]])
+def get_duplicate_tasks(
+    mode: str = Query("exact", pattern="^(exact|fuzzy)$"),
+    threshold: float = Query(duplicates.FUZZY_DEFAULT_THRESHOLD, ge=0.5, le=1.0),
+    db: Session = Depends(get_db)
+):
+    """
+    exact: tasks sharing a task number (case/whitespace-insensitive), grouped in SQL.
+    fuzzy: tasks whose descriptions are near-identical (slower; opt-in).
+    """
+    if mode == "fuzzy":
+        return duplicates.find_fuzzy_groups(db, threshold)
+    return duplicates.find_exact_groups(db)
+
+@router.put("/{task_id}", response_model=TaskOut)
 def update_task(task_id: int, update: TaskUpdate, db: Session = Depends(get_db)):
     task = db.query(models.Task).filter(models.Task.id == task_id).first()
     if not task:
@@ -185,34 +425,111 @@ def update_task(task_id: int, update: TaskUpdate, db: Session = Depends(get_db))
     update_data = update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(task, key, value)
+    if "assigned_agency" in update_data:
+        task.employee_id = employee_directory.resolve_id(db, task.assigned_agency)
 
     sync_task_status(task)
+    change_log.record(db, [task_id])
     db.commit()
+    task_events.publish("tasks", "update", [task_id], [task_to_dict(task)])
     return task
 
 @router.put("/bulk/update")
 def bulk_update_tasks(bulk_data: TaskBulkUpdateList, db: Session = Depends(get_db)):
-    updated_count = 0
+    """
+    Applies a batch of partial updates with one chunked IN lookup and one executemany.
+    Items carrying `updated_at` are written with `WHERE updated_at = :expected` instead, one
+    statement each, so a concurrent edit is caught by the database rather than a snapshot.
+    Each item is reported back as updated or failed (not_found / conflict).
+    """
+    item_ids = list({item.id for item in bulk_data.updates})
+    existing = set()
+    for start in range(0, len(item_ids), BULK_CHUNK_SIZE):
+        chunk = item_ids[start:start + BULK_CHUNK_SIZE]
+        existing.update(task_id for (task_id,) in db.query(models.Task.id).filter(models.Task.id.in_(chunk)))
+
+    now = datetime.utcnow()
+    mappings = []  # every write; statuses are filled in after the UPDATE
+    guarded = []  # (mapping, expected updated_at)
+    unguarded = []
+    failed = []
 
     for update_item in bulk_data.updates:
-        task = db.query(models.Task).filter(models.Task.id == update_item.id).first()
-        if not task:
-            continue
-
         update_data_dict = update_item.dict(exclude_unset=True)
         update_data_dict.pop('id', None)
+        expected_version = update_data_dict.pop('updated_at', None)
 
+        if update_item.id not in existing:
+            failed.append({"id": update_item.id, "error": "not_found"})
+            continue
         if not update_data_dict:
             continue
+        update_data_dict["updated_at"] = now
+        update_data_dict["id"] = update_item.id
+        mappings.append(update_data_dict)
+        if expected_version is not None:
+            guarded.append((update_data_dict, expected_version))
+        else:
+            unguarded.append(update_data_dict)
 
-        for key, value in update_data_dict.items():
-            setattr(task, key, value)
+    if not mappings:
+        return {"message": "Successfully updated 0 tasks", "updated": [], "failed": failed}
 
-        sync_task_status(task)
-        updated_count += 1
+    employee_ids = employee_directory.resolve_ids(db, [m["assigned_agency"] for m in mappings if "assigned_agency" in m])
+    for mapping in mappings:
+        if "assigned_agency" in mapping:
+            mapping["employee_id"] = employee_ids.get(mapping["assigned_agency"])
 
-    db.commit()
-    return {"message": f"Successfully updated {updated_count} tasks"}
+    try:
+        conflicts = set()
+        for mapping, expected_version in guarded:
+            values = {key: value for key, value in mapping.items() if key != "id"}
+            result = db.execute(
+                update(models.Task)
+                .where(models.Task.id == mapping["id"], models.Task.updated_at == expected_version)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if not result.rowcount:
+                conflicts.add(mapping["id"])
+        if unguarded:
+            # Grouped by column set and sent as executemany UPDATE ... WHERE id = ?
+            db.execute(update(models.Task), unguarded)
+
+        mappings = [m for m in mappings if m["id"] not in conflicts]
+        written_ids = list({m["id"] for m in mappings})
+        sync_statuses(db, written_ids)
+        sync_deadlines_due_in(db, written_ids)
+        change_log.record(db, written_ids)
+        current = {}
+        for start in range(0, len(item_ids), BULK_CHUNK_SIZE):
+            chunk = item_ids[start:start + BULK_CHUNK_SIZE]
+            rows = db.query(models.Task.id, models.Task.status, models.Task.updated_at).filter(models.Task.id.in_(chunk))
+            current.update((row.id, row) for row in rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Bulk update failed: {str(e)}")
+
+    for task_id in conflicts:
+        row = current.get(task_id)
+        if row is None:
+            failed.append({"id": task_id, "error": "not_found"})
+        else:
+            failed.append({"id": task_id, "error": "conflict", "updated_at": row.updated_at})
+    results = []
+    for mapping in mappings:
+        stored = current[mapping["id"]]
+        mapping["status"], mapping["updated_at"] = stored.status, stored.updated_at
+        results.append({"id": mapping["id"], "status": stored.status, "updated_at": stored.updated_at})
+
+    if mappings:
+        task_events.publish("tasks", "bulk_update", written_ids, mappings)
+    return {
+        "message": f"Successfully updated {len(results)} tasks",
+        "updated": results,
+        "failed": failed,
+    }
 
 @router.delete("/{task_id}")
 def delete_task(task_id: int, db: Session = Depends(get_db)):
@@ -221,7 +538,71 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Not Found")
 
     db.delete(task)
+    change_log.record(db, [task_id], change_log.DELETE)
     db.commit()
+    task_events.publish("tasks", "delete", [task_id])
     return {"message": "Task Deleted"}
 
+# --- Attachments ---
 
+@router.put("/{task_id}/attachment")
+def upload_attachment(task_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    try:
+        sha256, size = blob_store.put_file(file.file)
+    except blob_store.BlobTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    task.attachment_sha256 = sha256
+    task.attachment_size = size
+    task.attachment_type = file.content_type or "application/octet-stream"
+    change_log.record(db, [task_id])
+    db.commit()
+    task_events.publish("tasks", "update", [task_id], [{
+        "id": task_id,
+        "attachment_sha256": sha256,
+        "attachment_size": size,
+        "attachment_type": task.attachment_type,
+    }])
+    return {"sha256": sha256, "size": size, "content_type": task.attachment_type}
+
+@router.get("/{task_id}/attachment")
+def download_attachment(task_id: int, request: Request, db: Session = Depends(get_db)):
+    row = db.query(models.Task.attachment_sha256, models.Task.attachment_type)\
+        .filter(models.Task.id == task_id).first()
+    if not row or not blob_store.exists(row.attachment_sha256):
+        raise HTTPException(status_code=404, detail="No attachment")
+
+    # The URL is per task, not per content: a replaced attachment must show up on the next
+    # view, so clients revalidate every time. The blob hash makes that a cheap 304.
+    etag = f'"{row.attachment_sha256}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse streams from disk and answers Range requests with 206
+    return FileResponse(
+        blob_store.blob_path(row.attachment_sha256),
+        media_type=row.attachment_type or "application/octet-stream",
+        headers=headers,
+    )
+
+@router.delete("/{task_id}/attachment")
+def delete_attachment(task_id: int, db: Session = Depends(get_db)):
+    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    # The blob itself may be shared with other tasks; blob_store.collect_garbage prunes orphans
+    task.attachment_sha256 = None
+    task.attachment_type = None
+    task.attachment_size = None
+    change_log.record(db, [task_id])
+    db.commit()
+    task_events.publish("tasks", "update", [task_id], [{
+        "id": task_id, "attachment_sha256": None, "attachment_size": None, "attachment_type": None,
+    }])
+    return {"message": "Attachment removed"}
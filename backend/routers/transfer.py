@@ -0,0 +1,353 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from database import get_db, SessionLocal
+import models
+import task_events
+import sequences
+import change_log
+import employee_directory
+from routers.tasks import apply_task_filters, apply_keyset
+from status_engine import (
+    OPEN_STATUSES, derive_status, format_deadline_due_in, sync_statuses, sync_deadlines_due_in,
+    ensure_statuses_current,
+)
+from typing import Optional
+from datetime import date, datetime
+import csv
+import io
+import os
+import re
+import tempfile
+
+router = APIRouter()
+
+# --- Column mapping ---
+# (column, spreadsheet header). Import also accepts the raw column names.
+TRANSFER_COLUMNS = [
+    ("task_number", "Task/File No"),
+    ("description", "Description"),
+    ("assigned_agency", "Assigned To"),
+    ("priority", "Priority"),
+    ("allocated_date", "Allocated Date"),
+    ("time_given", "Time Given"),
+    ("deadline_date", "Deadline"),
+    ("deadline_due_in", "Deadline Due In"),
+    ("completion_date", "Completion Date"),
+    ("status", "Status"),
+    ("remarks", "Remarks"),
+    ("scheduled_date", "Scheduled Date"),
+    ("scheduled_time", "Scheduled Time"),
+    ("is_pinned", "Pinned"),
+]
+DATE_COLUMNS = {"allocated_date", "deadline_date", "scheduled_date"}
+EXPORT_YIELD_PER = 1000
+CSV_FLUSH_ROWS = 500
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y", "%d-%b-%Y", "%d %b %Y")
+
+
+def _header_key(value) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", str(value or "").strip().lower()).strip("_")
+
+
+HEADER_ALIASES = {}
+for _name, _label in TRANSFER_COLUMNS:
+    HEADER_ALIASES[_header_key(_name)] = _name
+    HEADER_ALIASES[_header_key(_label)] = _name
+
+# --- Export ---
+
+def _export_rows(agency, status, search):
+    """Yields one list of cell values per task, streaming from the DB in chunks."""
+    db = SessionLocal()
+    try:
+        ensure_statuses_current(db)
+        columns = [getattr(models.Task, name) for name, _ in TRANSFER_COLUMNS]
+        query, _ = apply_task_filters(db.query(*columns), agency, status, search)
+        query = apply_keyset(query, "deadline_date", None).execution_options(yield_per=EXPORT_YIELD_PER)
+        for row in query:
+            values = list(row)
+            values[-1] = 1 if values[-1] else 0  # is_pinned
+            yield values
+    finally:
+        db.close()
+
+
+def _stream_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the file as UTF-8
+    buffer.write("\ufeff")
+    writer.writerow([label for _, label in TRANSFER_COLUMNS])
+    for count, values in enumerate(rows, 1):
+        writer.writerow(["" if v is None else v for v in values])
+        if count % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _stream_xlsx(rows):
+    # write_only keeps one row in memory at a time; the zip is assembled in a temp file
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Tasks")
+    sheet.append([label for _, label in TRANSFER_COLUMNS])
+    for values in rows:
+        sheet.append(values)
+
+    with tempfile.TemporaryFile() as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(64 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
+
+@router.get("/export")
+def export_tasks(
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    agency: Optional[str] = None,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+):
+    """
+    Streams the filtered task list (same filters as GET /api/tasks/) as CSV or XLSX,
+    ordered by deadline. Columns use the spreadsheet headers, so the file can be re-imported.
+    """
+    stamp = date.today().isoformat()
+    rows = _export_rows(agency, status, search)
+    if format == "xlsx":
+        return StreamingResponse(
+            _stream_xlsx(rows),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": f'attachment; filename="tasks-{stamp}.xlsx"'},
+        )
+    return StreamingResponse(
+        _stream_csv(rows),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="tasks-{stamp}.csv"'},
+    )
+
+# --- Import ---
+
+def _read_csv(upload: UploadFile):
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return None, iter(())
+    return header, reader
+
+
+def _read_xlsx(upload: UploadFile):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(upload.file, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    header = next(rows, None)
+    return (list(header) if header else None), rows
+
+
+def _parse_date(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date '{text}'")
+
+
+def _clean(name: str, value):
+    if name in DATE_COLUMNS:
+        return _parse_date(value)
+    if name == "is_pinned":
+        return 1 if str(value or "").strip().lower() in ("1", "true", "yes", "y") else 0
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # spreadsheet numbers: 12.0 -> "12"
+    text = str(value).strip()
+    return text or None
+
+
+def _prepare(raw: dict) -> dict:
+    row = {name: _clean(name, value) for name, value in raw.items()}
+    # Open statuses are derived from the dates (after the write, for updates); only
+    # explicit terminal statuses such as "Completed" or "Deleted" are taken as given
+    if not row.get("status") or row["status"] in OPEN_STATUSES:
+        row.pop("status", None)
+    # Exported for reading only; the due-in text is always computed from the dates
+    row.pop("deadline_due_in", None)
+    return row
+
+
+def _write_batch(db: Session, batch, now: datetime, today: date):
+    """
+    Upserts one batch: rows whose task_number exists are updated, the rest inserted.
+    Returns (created_ids, updated_ids). Raises on constraint errors.
+    """
+    numbers = [row["task_number"] for _, row in batch if row.get("task_number")]
+    reserved = set(numbers)
+    existing = dict(
+        db.query(models.Task.task_number, models.Task.id).filter(models.Task.task_number.in_(numbers)).all()
+    ) if numbers else {}
+    employee_ids = employee_directory.resolve_ids(db, [row.get("assigned_agency") for _, row in batch])
+
+    updates, inserts, derive_ids = [], [], []
+    for _, row in batch:
+        task_id = existing.get(row.get("task_number"))
+        if "assigned_agency" in row:
+            row = {**row, "employee_id": employee_ids.get(row["assigned_agency"])}
+        if task_id is not None:
+            updates.append({**row, "id": task_id, "updated_at": now})
+            if "status" not in row:
+                derive_ids.append(task_id)
+            continue
+        row = dict(row)
+        if not row.get("task_number"):
+            # Don't hand out a number another row of this batch is about to insert
+            number = sequences.next_task_number(db)
+            while number in reserved:
+                number = sequences.next_task_number(db)
+            row["task_number"] = number
+        if "status" not in row:
+            row["status"] = derive_status(row.get("completion_date"), row.get("deadline_date"), today)
+        row["deadline_due_in"] = format_deadline_due_in(row.get("completion_date"), row.get("deadline_date"), today)
+        inserts.append({**row, "source": "Sheet", "created_at": now, "updated_at": now})
+
+    if updates:
+        db.execute(update(models.Task), updates)
+        sync_statuses(db, derive_ids, today)
+        sync_deadlines_due_in(db, [row["id"] for row in updates], today)
+    created_ids = []
+    if inserts:
+        created_ids = list(db.execute(insert(models.Task).returning(models.Task.id), inserts).scalars())
+        # Imported "Task N" numbers are taken: move the counter past them in the same transaction
+        imported = [sequences.task_number_value(row["task_number"]) for row in inserts]
+        imported = [value for value in imported if value is not None]
+        if imported:
+            sequences.advance_counter(db, sequences.TASK_NUMBER, max(imported))
+    updated_ids = [row["id"] for row in updates]
+    change_log.record(db, created_ids + updated_ids)
+    return created_ids, updated_ids
+
+
+def _flush(db: Session, batch, result, dry_run: bool, now: datetime, today: date):
+    if not batch:
+        return
+    try:
+        created, updated = _write_batch(db, batch, now, today)
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+        result["created"] += len(created)
+        result["updated"] += len(updated)
+        return
+    except Exception:
+        db.rollback()
+
+    # Something in the batch violated a constraint: redo it row by row to isolate the bad ones
+    for row_number, row in batch:
+        try:
+            created, updated = _write_batch(db, [(row_number, row)], now, today)
+            if dry_run:
+                db.rollback()
+            else:
+                db.commit()
+            result["created"] += len(created)
+            result["updated"] += len(updated)
+        except Exception as e:
+            db.rollback()
+            _report(result, row_number, row.get("task_number"), str(getattr(e, "orig", e)))
+
+
+def _report(result, row_number: int, task_number, error: str):
+    result["failed"] += 1
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append({"row": row_number, "task_number": task_number, "error": error})
+
+
+@router.post("/import")
+def import_tasks(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Upserts tasks from a CSV or XLSX file, matched on task number (rows without one are
+    created with a generated number). Header names may be the export headers or column
+    names; only columns present in the file are written, and blank cells clear the field.
+    Open statuses are re-derived from the dates like a normal edit.
+    Rows are written in batches of IMPORT_BATCH_SIZE, each in its own transaction; bad rows
+    are skipped and listed in `errors` with their spreadsheet row number.
+    `dry_run=true` validates and writes nothing.
+    """
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in (".csv", ".xlsx"):
+        raise HTTPException(status_code=400, detail="Upload a .csv or .xlsx file")
+    try:
+        header, rows = _read_xlsx(file) if extension == ".xlsx" else _read_csv(file)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read file: {e}")
+    if not header:
+        raise HTTPException(status_code=400, detail="The file is empty")
+
+    mapping = [(index, HEADER_ALIASES.get(_header_key(title))) for index, title in enumerate(header)]
+    mapping = [(index, name) for index, name in mapping if name]
+    if not mapping:
+        raise HTTPException(status_code=400, detail="No recognised columns in the header row")
+
+    ensure_statuses_current(db)
+    today = date.today()
+    now = datetime.utcnow()
+    result = {"created": 0, "updated": 0, "failed": 0, "skipped_blank": 0, "errors": [], "dry_run": dry_run}
+    seen_numbers = {}
+    batch = []
+    try:
+        for row_number, values in enumerate(rows, start=2):  # row 1 is the header
+            values = list(values or ())
+            raw = {name: values[index] if index < len(values) else None for index, name in mapping}
+            if all(value is None or str(value).strip() == "" for value in raw.values()):
+                result["skipped_blank"] += 1
+                continue
+            try:
+                row = _prepare(raw)
+            except ValueError as e:
+                _report(result, row_number, raw.get("task_number"), str(e))
+                continue
+
+            number = row.get("task_number")
+            if number:
+                if number in seen_numbers:
+                    _report(result, row_number, number, f"duplicate of row {seen_numbers[number]} in this file")
+                    continue
+                seen_numbers[number] = row_number
+
+            batch.append((row_number, row))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                _flush(db, batch, result, dry_run, now, today)
+                batch = []
+        _flush(db, batch, result, dry_run, now, today)
+    finally:
+        if not dry_run and (result["created"] or result["updated"]):
+            # Set-based change: caches drop everything, live clients reload
+            task_events.publish("tasks", "import", None)
+
+    result["errors_truncated"] = result["failed"] > len(result["errors"])
+    return result
@@ -0,0 +1,200 @@
+# scheduler.py
+# In-process background jobs (APScheduler): the daily status rollover and due-in text,
+# database upkeep, email debug log rotation, change log pruning, employee relinking and blob GC.
+# Every worker starts a scheduler, but only the one holding the leader lock runs the
+# maintenance jobs; the others retry the lock every minute so a restart hands over.
+#
+# SCHEDULER_ENABLED=0 turns it off (request handlers then do the rollover lazily again).
+# With it on, requests still take over the rollover if no leader has stamped it by
+# SCHEDULER_GRACE_SECONDS past midnight (see status_engine.ensure_statuses_current).
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import text
+from datetime import date, datetime
+from database import SessionLocal, engine, IS_SQLITE, DATA_DIR
+import os
+import status_engine
+import change_log
+import blob_store
+import employee_directory
+import task_events
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1").lower() not in ("0", "false", "no")
+CHANGE_LOG_KEEP_DAYS = int(os.getenv("CHANGE_LOG_KEEP_DAYS", 30))
+EMAIL_DEBUG_LOG = "email_debug.txt"  # written by routers/auth.py, relative to the working directory
+EMAIL_LOG_MAX_BYTES = int(os.getenv("EMAIL_LOG_MAX_BYTES", 1024 * 1024))
+EMAIL_LOG_BACKUPS = 3
+# Postgres advisory lock key for the scheduler leader (migrations use 74201)
+PG_LEADER_LOCK_KEY = 74202
+
+_scheduler = None
+_leader = None  # open lock file (SQLite) or connection (Postgres) while this process leads
+
+# --- Leader election ---
+
+def _try_become_leader() -> bool:
+    global _leader
+    if not IS_SQLITE:
+        connection = engine.connect()
+        acquired = connection.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": PG_LEADER_LOCK_KEY}).scalar()
+        connection.commit()
+        if acquired:
+            _leader = connection  # the lock lives as long as this connection
+        else:
+            connection.close()
+        return bool(acquired)
+
+    try:
+        import fcntl
+    except ImportError:  # Windows dev machines: single process assumed
+        _leader = True
+        return True
+    lock_file = open(os.path.join(DATA_DIR, ".scheduler.lock"), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _leader = lock_file  # released by the OS if this process dies
+    return True
+
+
+def _elect():
+    if _leader is not None:
+        return
+    if not _try_become_leader():
+        return
+    print(f"✅ Scheduler: worker {os.getpid()} is the maintenance leader")
+    now = datetime.now()
+    _scheduler.add_job(daily_rollover, "cron", hour=0, minute=0, second=30, id="daily_rollover",
+                       next_run_time=now)
+    _scheduler.add_job(db_maintenance, "cron", hour=3, minute=0, id="db_maintenance")
+    _scheduler.add_job(prune_change_log, "cron", hour=3, minute=30, id="prune_change_log")
+    _scheduler.add_job(relink_employees, "cron", hour=3, minute=45, id="relink_employees")
+    _scheduler.add_job(collect_blob_garbage, "cron", hour=4, minute=0, id="blob_gc")
+    _scheduler.add_job(rotate_email_log, "interval", hours=1, id="rotate_email_log", next_run_time=now)
+
+# --- Jobs ---
+
+def daily_rollover():
+    """Status rollover plus the due-in text for the new day, published as one change."""
+    today = date.today()
+    db = SessionLocal()
+    try:
+        changed, due_in = status_engine.run_daily_rollover(db, today)
+    except Exception as e:
+        print(f"❌ Scheduler: rollover failed: {e}")
+        return
+    finally:
+        db.close()
+    print(f"🔄 Scheduler: rollover for {today}: {changed} statuses, {due_in} due-in texts updated")
+    if changed or due_in:
+        task_events.publish("tasks", "rollover", None)
+
+
+def db_maintenance():
+    """Daily planner statistics; a full VACUUM on Sundays."""
+    full = date.today().weekday() == 6
+    try:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            if IS_SQLITE:
+                connection.execute(text("PRAGMA optimize"))
+                if full:
+                    connection.execute(text("VACUUM"))
+            else:
+                connection.execute(text("VACUUM ANALYZE" if full else "ANALYZE"))
+        print(f"✅ Scheduler: database {'vacuumed and analyzed' if full else 'analyzed'}")
+    except Exception as e:
+        print(f"⚠️ Scheduler: database maintenance skipped: {e}")
+
+
+def prune_change_log():
+    db = SessionLocal()
+    try:
+        removed = change_log.prune(db, CHANGE_LOG_KEEP_DAYS)
+        db.commit()
+        if removed:
+            print(f"🔄 Scheduler: pruned {removed} change log entries")
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Scheduler: change log prune failed: {e}")
+    finally:
+        db.close()
+
+
+def relink_employees():
+    """Tasks naming an employee but missing employee_id would drop out of employee filters."""
+    db = SessionLocal()
+    try:
+        linked = employee_directory.link_unlinked_tasks(db)
+        db.commit()
+        if linked:
+            print(f"🔄 Scheduler: linked {linked} tasks to their employee")
+            task_events.publish("tasks", "relink", None)
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Scheduler: employee relink failed: {e}")
+    finally:
+        db.close()
+
+
+def collect_blob_garbage():
+    try:
+        with engine.connect() as connection:
+            removed = blob_store.collect_garbage(connection)
+        if removed:
+            print(f"🔄 Scheduler: removed {removed} unreferenced attachment blobs")
+    except Exception as e:
+        print(f"⚠️ Scheduler: blob GC failed: {e}")
+
+
+def rotate_email_log():
+    """email_debug.txt -> .1 -> .2 ... once it passes EMAIL_LOG_MAX_BYTES."""
+    try:
+        if not os.path.exists(EMAIL_DEBUG_LOG) or os.path.getsize(EMAIL_DEBUG_LOG) < EMAIL_LOG_MAX_BYTES:
+            return
+        for index in range(EMAIL_LOG_BACKUPS - 1, 0, -1):
+            older = f"{EMAIL_DEBUG_LOG}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{EMAIL_DEBUG_LOG}.{index + 1}")
+        os.replace(EMAIL_DEBUG_LOG, f"{EMAIL_DEBUG_LOG}.1")
+        print("🔄 Scheduler: rotated email_debug.txt")
+    except OSError as e:
+        print(f"⚠️ Scheduler: email log rotation failed: {e}")
+
+# --- Lifecycle ---
+
+def start():
+    global _scheduler
+    if not SCHEDULER_ENABLED or _scheduler is not None:
+        return
+    _scheduler = BackgroundScheduler(job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 3600})
+    _scheduler.add_job(_elect, "interval", minutes=1, id="leader_election", next_run_time=datetime.now())
+    _scheduler.start()
+    # Some worker (this one or another) should now own the rollover; requests keep a fallback
+    status_engine.hand_off_to_scheduler()
+
+
+def shutdown():
+    global _scheduler, _leader
+    if _scheduler is None:
+        return
+    _scheduler.shutdown(wait=False)
+    _scheduler = None
+    if _leader is not None and _leader is not True:
+        _leader.close()
+    _leader = None
+
+
+def status() -> dict:
+    """For /health."""
+    if _scheduler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "leader": _leader is not None,
+        "jobs": [
+            {"id": job.id, "next_run": job.next_run_time.isoformat() if job.next_run_time else None}
+            for job in _scheduler.get_jobs()
+        ],
+    }
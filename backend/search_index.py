@@ -0,0 +1,123 @@
+# search_index.py
+# Full-text search over task_number, description and remarks.
+# SQLite: an external-content FTS5 table kept in sync by triggers.
+# Postgres: an expression GIN index on a tsvector plus a trigram index on task_number.
+
+from sqlalchemy import text, func, literal_column, table, column, or_
+import re
+import models
+
+FTS_TABLE = "tasks_fts"
+# bm25 column weights: task_number, description, remarks
+BM25_WEIGHTS = (10.0, 1.0, 0.5)
+PG_DOCUMENT_SQL = (
+    "to_tsvector('simple', coalesce(task_number, '') || ' ' || "
+    "coalesce(description, '') || ' ' || coalesce(remarks, ''))"
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_fts_ready = {}  # dialect name -> bool, filled lazily
+
+fts = table(FTS_TABLE, column("rowid"))
+
+
+def _tokens(term: str):
+    return _TOKEN_RE.findall(term.lower())
+
+
+def setup(connection):
+    """Creates the index structures if missing. Safe to call on every boot."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"), {"n": FTS_TABLE}
+        ).first()
+        if not exists:
+            print("🔄 Migration: Creating full-text search index...")
+            connection.execute(text(f"""
+                CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+                    task_number, description, remarks,
+                    content='tasks', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                )
+            """))
+            connection.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+                    INSERT INTO {FTS_TABLE}(rowid, task_number, description, remarks)
+                    VALUES (new.id, new.task_number, new.description, new.remarks);
+                END
+            """))
+            connection.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+                    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, task_number, description, remarks)
+                    VALUES ('delete', old.id, old.task_number, old.description, old.remarks);
+                END
+            """))
+            connection.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF task_number, description, remarks ON tasks BEGIN
+                    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, task_number, description, remarks)
+                    VALUES ('delete', old.id, old.task_number, old.description, old.remarks);
+                    INSERT INTO {FTS_TABLE}(rowid, task_number, description, remarks)
+                    VALUES (new.id, new.task_number, new.description, new.remarks);
+                END
+            """))
+            # Persist the weighting so `ORDER BY rank` uses it without a per-query bm25() call
+            weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25({weights})')"))
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            connection.commit()
+    elif dialect == "postgresql":
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_tasks_search_tsv ON tasks USING GIN (({PG_DOCUMENT_SQL}))"
+        ))
+        connection.commit()
+        try:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_tasks_task_number_trgm ON tasks USING GIN (task_number gin_trgm_ops)"
+            ))
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            print(f"⚠️ pg_trgm unavailable, task number substring search will scan: {e}")
+    _fts_ready.pop(dialect, None)
+
+
+def _is_ready(session) -> bool:
+    dialect = session.get_bind().dialect.name
+    if dialect not in _fts_ready:
+        if dialect == "sqlite":
+            _fts_ready[dialect] = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"), {"n": FTS_TABLE}
+            ).first() is not None
+        else:
+            _fts_ready[dialect] = dialect == "postgresql"
+    return _fts_ready[dialect]
+
+
+def apply_search(query, term: str):
+    """
+    Filters `query` (over models.Task) to rows matching `term` with prefix matching.
+    Returns (query, rank_expression); lower rank sorts first. rank is None on the LIKE fallback.
+    """
+    tokens = _tokens(term)
+    session = query.session
+    if not tokens or not _is_ready(session):
+        pattern = f"%{term}%"
+        return query.filter(
+            models.Task.description.like(pattern)
+            | models.Task.task_number.like(pattern)
+            | models.Task.remarks.like(pattern)
+        ), None
+
+    if session.get_bind().dialect.name == "sqlite":
+        match = " ".join(f'"{token}"*' for token in tokens)
+        rank = literal_column(f"{FTS_TABLE}.rank")
+        query = query.join(fts, fts.c.rowid == models.Task.id)\
+            .filter(literal_column(FTS_TABLE).op("MATCH")(match))
+        return query, rank
+
+    ts_query = func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+    document = literal_column(PG_DOCUMENT_SQL)
+    query = query.filter(or_(document.op("@@")(ts_query), models.Task.task_number.ilike(f"%{term}%")))
+    return query, -func.ts_rank(document, ts_query)
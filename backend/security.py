@@ -0,0 +1,131 @@
+# security.py
+# JWT issue/verify and the `current_user` dependency for protected routes.
+#
+# Tokens are stateless: username and role travel in the signed claims, so verifying a
+# request never touches the users table. Decoded tokens are kept in a small LRU (until
+# they expire) so repeat requests skip the signature check too. The flip side: a role
+# change or deleted user takes effect when the token expires (ACCESS_TOKEN_EXPIRE_MINUTES).
+#
+# Usage:
+#   @router.delete("/{emp_id}")
+#   def delete_employee(emp_id: int, user: TokenUser = Depends(require_role("admin"))): ...
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwt, JWTError
+from pydantic import BaseModel
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+import os
+import threading
+import time
+
+SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key-change-me")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 1 day
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
+
+# Failed logins per (client, username) before a cool-off
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", 5))
+LOGIN_WINDOW_SECONDS = int(os.getenv("LOGIN_WINDOW_SECONDS", 300))
+
+
+class TokenUser(BaseModel):
+    username: str
+    role: str
+
+
+def create_access_token(data: dict):
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+# --- Token verification ---
+
+_token_cache = OrderedDict()  # token -> (TokenUser, exp timestamp)
+_token_lock = threading.Lock()
+
+
+def decode_token(token: str) -> Optional[TokenUser]:
+    """Claims of a valid, unexpired token, or None."""
+    now = time.time()
+    with _token_lock:
+        cached = _token_cache.get(token)
+        if cached and cached[1] > now:
+            _token_cache.move_to_end(token)
+            return cached[0]
+
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if not claims.get("sub") or not claims.get("exp"):
+        return None
+    user = TokenUser(username=claims["sub"], role=claims.get("role") or "viewer")
+
+    with _token_lock:
+        _token_cache[token] = (user, float(claims["exp"]))
+        _token_cache.move_to_end(token)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return user
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> TokenUser:
+    """Dependency: the caller from the Bearer token, or 401."""
+    user = decode_token(credentials.credentials) if credentials else None
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+def require_role(*roles: str):
+    """Dependency factory: current_user, plus 403 unless their role is one of `roles`."""
+    def dependency(user: TokenUser = Depends(current_user)) -> TokenUser:
+        if user.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
+        return user
+    return dependency
+
+# --- Login rate limiting ---
+# Per process; with several workers the effective limit is per worker.
+
+_failures = {}  # (client, username) -> [failure timestamps]
+_failures_lock = threading.Lock()
+
+
+def login_retry_after(client: str, username: str) -> int:
+    """Seconds until this client may try this username again (0 = allowed now)."""
+    now = time.monotonic()
+    with _failures_lock:
+        recent = [t for t in _failures.get((client, username), ()) if now - t < LOGIN_WINDOW_SECONDS]
+        if recent:
+            _failures[(client, username)] = recent
+        else:
+            _failures.pop((client, username), None)
+        if len(recent) < LOGIN_MAX_FAILURES:
+            return 0
+        return int(LOGIN_WINDOW_SECONDS - (now - recent[0])) + 1
+
+
+def record_login_failure(client: str, username: str):
+    with _failures_lock:
+        _failures.setdefault((client, username), []).append(time.monotonic())
+        if len(_failures) > 10000:
+            # Bound memory under a spray of usernames: forget the oldest keys
+            for key in list(_failures)[:5000]:
+                _failures.pop(key, None)
+
+
+def clear_login_failures(client: str, username: str):
+    with _failures_lock:
+        _failures.pop((client, username), None)
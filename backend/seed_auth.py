@@ -1,47 +1,13 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from database import SessionLocal, engine, Base
+from database import SessionLocal
+from migrations import upgrade
 import models
 from utils import get_password_hash
 
-# Ensure tables exist
-Base.metadata.create_all(bind=engine)
-
-def migrate_db(db: Session):
-    """
-    Manually add columns that might be missing using SQLite-compatible checks.
-    """
-    try:
-        with engine.connect() as connection:
-            # Check existing columns
-            result = connection.execute(text("PRAGMA table_info(users)"))
-            columns = [row[1] for row in result.fetchall()]
-            
-            # Helper to add column if missing
-            def add_column(col_name, col_type):
-                if col_name not in columns:
-                    print(f"🔄 Migration: Adding '{col_name}' column to users table...")
-                    try:
-                        connection.execute(text(f"ALTER TABLE users ADD COLUMN {col_name} {col_type}"))
-                        connection.commit()
-                        print(f"✅ Users Migration: '{col_name}' added.")
-                    except Exception as e:
-                        print(f"⚠️ Failed to add {col_name}: {e}")
-
-            add_column("email", "VARCHAR")
-            add_column("password_hint", "VARCHAR")
-            add_column("reset_token", "VARCHAR")
-            add_column("reset_token_expiry", "TIMESTAMP")
-
-        print("Database migration checks completed.")
-    except Exception as e:
-        print(f"Migration step error: {e}")
-
 def seed_admin():
     db = SessionLocal()
     try:
-        # Run Migration First
-        migrate_db(db)
+        # Make sure the users table is current (cheap when it already is)
+        upgrade()
 
         username = "admin"
         email = ""
@@ -0,0 +1,96 @@
+# sequences.py
+# Atomic counters backed by the `counters` table (works the same on SQLite and Postgres).
+# Allocation is a single UPDATE ... RETURNING inside the caller's transaction, so the
+# row lock serialises concurrent creates and a rolled-back insert gives its number back.
+
+from sqlalchemy import update, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Optional
+import models
+
+TASK_NUMBER = "task_number"
+TASK_NUMBER_PREFIX = "Task "
+
+
+def task_number_value(task_number) -> Optional[int]:
+    """N for a "Task N" number, else None."""
+    if not task_number or not task_number.startswith(TASK_NUMBER_PREFIX):
+        return None
+    suffix = task_number[len(TASK_NUMBER_PREFIX):].strip()
+    return int(suffix) if suffix.isdigit() else None
+
+
+def max_task_number(connection) -> int:
+    """Highest N among existing "Task N" numbers. Seeds (or re-seeds) the counter."""
+    rows = connection.execute(
+        text("SELECT task_number FROM tasks WHERE task_number LIKE :p"), {"p": TASK_NUMBER_PREFIX + "%"}
+    )
+    values = [task_number_value(task_number) for (task_number,) in rows]
+    return max([value for value in values if value is not None], default=0)
+
+
+def seed_task_number_counter(connection):
+    exists = connection.execute(
+        select(models.Counter.value).where(models.Counter.name == TASK_NUMBER)
+    ).first()
+    if exists:
+        return
+    start = max_task_number(connection)
+    connection.execute(models.Counter.__table__.insert().values(name=TASK_NUMBER, value=start))
+    connection.commit()
+    print(f"🔄 Migration: Seeded task number counter at {start}")
+
+
+def next_value(db: Session, name: str) -> int:
+    stmt = (
+        update(models.Counter)
+        .where(models.Counter.name == name)
+        .values(value=models.Counter.value + 1)
+        .returning(models.Counter.value)
+    )
+    value = db.execute(stmt).scalar()
+    if value is not None:
+        return value
+
+    # Counter row missing (fresh table): seed it, tolerating a concurrent seeder
+    start = max_task_number(db.connection()) if name == TASK_NUMBER else 0
+    try:
+        with db.begin_nested():
+            db.add(models.Counter(name=name, value=start))
+    except IntegrityError:
+        pass
+    return db.execute(stmt).scalar()
+
+
+def counter_value(db: Session, name: str) -> Optional[int]:
+    return db.query(models.Counter.value).filter(models.Counter.name == name).scalar()
+
+
+def advance_counter(db: Session, name: str, value: int):
+    """Moves a counter up to `value` (never down), for values written without next_value."""
+    result = db.execute(
+        update(models.Counter)
+        .where(models.Counter.name == name, models.Counter.value < value)
+        .values(value=value)
+    )
+    if result.rowcount or counter_value(db, name) is not None:
+        return
+    try:
+        with db.begin_nested():
+            db.add(models.Counter(name=name, value=value))
+    except IntegrityError:
+        pass  # a concurrent writer created it; the next advance moves it
+
+
+def next_task_number(db: Session) -> str:
+    """
+    Next free "Task N". If the number was typed in manually, the counter jumps past the
+    highest existing "Task N" rather than stepping through taken numbers one by one.
+    """
+    while True:
+        candidate = f"{TASK_NUMBER_PREFIX}{next_value(db, TASK_NUMBER)}"
+        taken = db.query(models.Task.id).filter(models.Task.task_number == candidate).first()
+        if not taken:
+            return candidate
+        advance_counter(db, TASK_NUMBER, max_task_number(db.connection()))
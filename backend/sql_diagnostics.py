@@ -0,0 +1,261 @@
+# sql_diagnostics.py
+# Opt-in watch on query behaviour (SQL_DIAGNOSTICS=1):
+#
+# - slow statements (>= SQL_SLOW_MS) are logged with their EXPLAIN QUERY PLAN / EXPLAIN output
+# - within a sampled request, a statement shape repeated SQL_N_PLUS_ONE_THRESHOLD+ times is
+#   reported as a likely N+1 (a per-item SELECT inside a loop)
+#
+# Records go to a rolling JSONL file, DATA_DIR/sql_diagnostics.jsonl (+ .1, .2, ...).
+# The request path only does a timing compare and a dict increment; EXPLAIN runs on a
+# separate connection in a background thread, each shape at most once per cooldown, and
+# records are dropped rather than queued without bound. Parameters are not logged unless
+# SQL_DIAGNOSTICS_LOG_PARAMS=1 (they can hold personal data).
+#
+# Summary of the current report: python sql_diagnostics.py
+
+from contextvars import ContextVar
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+from datetime import datetime
+from database import engine, async_engine, IS_SQLITE, DATA_DIR
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import sql_timing
+
+SQL_DIAGNOSTICS = os.getenv("SQL_DIAGNOSTICS", "0").lower() in ("1", "true", "yes")
+SLOW_MS = float(os.getenv("SQL_SLOW_MS", 200))
+SAMPLE_RATE = float(os.getenv("SQL_DIAGNOSTICS_SAMPLE_RATE", 0.05))  # share of requests checked for N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", 10))
+COOLDOWN_SECONDS = int(os.getenv("SQL_DIAGNOSTICS_COOLDOWN_SECONDS", 600))  # per shape (and route)
+LOG_PARAMS = os.getenv("SQL_DIAGNOSTICS_LOG_PARAMS", "0").lower() in ("1", "true", "yes")
+REPORT_PATH = os.path.join(DATA_DIR, "sql_diagnostics.jsonl")
+REPORT_MAX_BYTES = int(os.getenv("SQL_DIAGNOSTICS_MAX_BYTES", 5 * 1024 * 1024))
+REPORT_BACKUPS = 3
+MAX_PENDING = 100
+MAX_STATEMENT_CHARS = 2000
+
+EXPLAINABLE = ("select", "with", "update", "delete", "insert")
+
+_current = ContextVar("sql_diagnostics_trace", default=None)
+_pending = queue.Queue(maxsize=MAX_PENDING)
+_last_reported = {}  # (kind, shape, route) -> monotonic time
+_reported_lock = threading.Lock()
+_worker = None
+
+
+class _RequestTrace:
+    __slots__ = ("scope", "sampled", "shapes", "shape_ms", "statements")
+
+    def __init__(self, scope, sampled: bool):
+        self.scope = scope
+        self.sampled = sampled
+        self.shapes = Counter()
+        self.shape_ms = Counter()
+        self.statements = {}
+
+    @property
+    def route(self) -> str:
+        from metrics import route_template
+        return f"{self.scope['method']} {route_template(self.scope)}"
+
+# --- Statement shapes ---
+
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s|\$\d+|%\([^)]*\)s)(?:\s*,\s*(?:\?|%s|\$\d+|%\([^)]*\)s))*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Short hash of the statement with IN-lists and numeric literals collapsed."""
+    normalized = _IN_LIST.sub("(?)", statement)
+    normalized = _NUMBER.sub("N", _SPACE.sub(" ", normalized)).strip().lower()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def _due(kind: str, shape: str, route: str) -> bool:
+    """Rate limit: one record per (kind, shape, route) per cooldown."""
+    key = (kind, shape, route)
+    now = time.monotonic()
+    with _reported_lock:
+        last = _last_reported.get(key)
+        if last is not None and now - last < COOLDOWN_SECONDS:
+            return False
+        _last_reported[key] = now
+        if len(_last_reported) > 10000:
+            _last_reported.clear()
+    return True
+
+
+def _enqueue(record: dict):
+    try:
+        _pending.put_nowait(record)
+    except queue.Full:
+        pass  # under a storm of slow queries, drop rather than slow requests down
+
+# --- Statement hook (timed by sql_timing.py) ---
+
+def _record_statement(conn, statement, parameters, executemany, elapsed):
+    elapsed_ms = elapsed * 1000
+    if statement.startswith("EXPLAIN"):
+        return  # our own plan capture
+    trace = _current.get()
+
+    if trace is not None and trace.sampled:
+        shape = statement_shape(statement)
+        trace.shapes[shape] += 1
+        trace.shape_ms[shape] += elapsed_ms
+        trace.statements.setdefault(shape, statement)
+
+    if elapsed_ms < SLOW_MS:
+        return
+    shape = statement_shape(statement)
+    route = trace.route if trace is not None else "background"
+    if not _due("slow", shape, route):
+        return
+    record = {
+        "kind": "slow", "route": route, "ms": round(elapsed_ms, 1), "shape": shape,
+        "statement": statement[:MAX_STATEMENT_CHARS], "executemany": executemany,
+    }
+    if LOG_PARAMS and not executemany:
+        record["params"] = repr(parameters)[:MAX_STATEMENT_CHARS]
+    if not executemany and statement.lstrip().lower().startswith(EXPLAINABLE):
+        # Kept out of the record; only used to build the EXPLAIN
+        record["_explain"] = (statement, parameters, conn.engine is async_engine.sync_engine)
+    print(f"⚠️ Slow SQL ({elapsed_ms:.0f} ms) in {route}: {_SPACE.sub(' ', statement)[:120]}")
+    _enqueue(record)
+
+# --- Request boundary ---
+
+class DiagnosticsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace = _RequestTrace(scope, random.random() < SAMPLE_RATE)
+        token = _current.set(trace)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            if trace.sampled:
+                _check_n_plus_one(trace)
+
+
+def _check_n_plus_one(trace: _RequestTrace):
+    for shape, count in trace.shapes.items():
+        if count < N_PLUS_ONE_THRESHOLD:
+            continue
+        route = trace.route
+        if not _due("n_plus_one", shape, route):
+            continue
+        print(f"⚠️ Possible N+1 in {route}: same statement {count}x")
+        _enqueue({
+            "kind": "n_plus_one", "route": route, "shape": shape, "count": count,
+            "total_ms": round(trace.shape_ms[shape], 1),
+            "statements_in_request": sum(trace.shapes.values()),
+            "statement": trace.statements[shape][:MAX_STATEMENT_CHARS],
+        })
+
+# --- Background writer ---
+
+def _explain(statement: str, parameters, from_async_engine: bool):
+    """Plan lines for a statement, run on a fresh connection of the sync engine."""
+    if not IS_SQLITE and from_async_engine:
+        # asyncpg uses $1..$n; psycopg2 (the sync engine) wants %s in the same order
+        positional = list(parameters or ())
+        order = [int(n) - 1 for n in re.findall(r"\$(\d+)", statement)]
+        statement = re.sub(r"\$\d+", "%s", statement.replace("%", "%%"))
+        parameters = tuple(positional[index] for index in order)
+    prefix = "EXPLAIN QUERY PLAN " if IS_SQLITE else "EXPLAIN "
+    with engine.connect() as connection:
+        try:
+            rows = connection.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+        finally:
+            connection.rollback()
+    if IS_SQLITE:
+        return [row[-1] for row in rows]  # (id, parent, notused, detail)
+    return [row[0] for row in rows]
+
+
+def _report_logger():
+    logger = logging.getLogger("sql_diagnostics")
+    if not logger.handlers:
+        handler = RotatingFileHandler(REPORT_PATH, maxBytes=REPORT_MAX_BYTES, backupCount=REPORT_BACKUPS,
+                                      encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def _drain():
+    logger = _report_logger()
+    while True:
+        record = _pending.get()
+        explain = record.pop("_explain", None)
+        if explain:
+            try:
+                record["plan"] = _explain(*explain)
+            except Exception as e:
+                record["plan_error"] = str(e)[:500]
+        record["at"] = datetime.utcnow().isoformat(timespec="seconds")
+        logger.info(json.dumps(record, default=str))
+
+
+def install(app):
+    """Listens to every statement (sql_timing) and adds the middleware. No-op unless SQL_DIAGNOSTICS is on."""
+    global _worker
+    if not SQL_DIAGNOSTICS:
+        return
+    sql_timing.add_listener(_record_statement)
+    app.add_middleware(DiagnosticsMiddleware)
+    if _worker is None:
+        _worker = threading.Thread(target=_drain, name="sql-diagnostics", daemon=True)
+        _worker.start()
+    print(f"✅ SQL diagnostics on: slow >= {SLOW_MS:.0f} ms, N+1 sampling {SAMPLE_RATE:.0%}, report {REPORT_PATH}")
+
+# --- Report summary ---
+
+def summarize(path: str = REPORT_PATH):
+    """Groups the report by (kind, shape): occurrences, worst case, routes, a sample plan."""
+    groups = {}
+    for name in [f"{path}.{i}" for i in range(REPORT_BACKUPS, 0, -1)] + [path]:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                group = groups.setdefault((record["kind"], record["shape"]), {
+                    "seen": 0, "worst": 0, "routes": set(), "statement": record["statement"], "plan": None,
+                })
+                group["seen"] += 1
+                group["worst"] = max(group["worst"], record.get("ms") or record.get("count") or 0)
+                group["routes"].add(record["route"])
+                group["plan"] = record.get("plan") or group["plan"]
+
+    if not groups:
+        print("No diagnostics recorded.")
+        return
+    for (kind, shape), group in sorted(groups.items(), key=lambda item: -item[1]["worst"]):
+        worst = f"{group['worst']} ms" if kind == "slow" else f"{group['worst']}x per request"
+        print(f"{kind:<11} {shape}  seen {group['seen']}, worst {worst}  [{', '.join(sorted(group['routes']))}]")
+        print(f"    {_SPACE.sub(' ', group['statement'])[:200]}")
+        for plan_line in group["plan"] or []:
+            print(f"      {plan_line}")
+
+
+if __name__ == "__main__":
+    summarize()
@@ -0,0 +1,45 @@
+# sql_timing.py
+# Times every SQL statement once, on both engines, and hands the result to whoever asked.
+# metrics.py (per-request statement counts and DB time) and sql_diagnostics.py (slow
+# statements, N+1 shapes) both listen here instead of each wrapping the cursor.
+#
+# Usage:
+#   def on_statement(conn, statement, parameters, executemany, elapsed_seconds): ...
+#   sql_timing.add_listener(on_statement)
+
+from sqlalchemy import event
+from database import engine, async_engine
+import time
+
+_listeners = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_timing_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("sql_timing_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    for listener in _listeners:
+        listener(conn, statement, parameters, executemany, elapsed)
+
+
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute; drop their start time
+    started = exception_context.connection.info.get("sql_timing_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def add_listener(listener):
+    """Registers `listener` for every statement; the engine hooks go in with the first one."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+    for sync_engine in (engine, async_engine.sync_engine):
+        if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(sync_engine, "handle_error", _handle_error)
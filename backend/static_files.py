@@ -0,0 +1,65 @@
+# static_files.py
+# Serving for the built frontend.
+# Vite puts content-hashed files under /assets, so those can be cached for a year as immutable.
+# When compress_assets.py has written a .br / .gz sibling, that is sent instead of
+# compressing on every request.
+
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.responses import FileResponse
+from starlette.datastructures import Headers
+import mimetypes
+import os
+import stat
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Preferred first
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def precompressed_response(full_path, accept_encoding: str, status_code: int = 200):
+    """FileResponse for the best .br/.gz sibling the client accepts, or None."""
+    for encoding, suffix in PRECOMPRESSED:
+        if encoding not in accept_encoding:
+            continue
+        try:
+            compressed_stat = os.stat(f"{full_path}{suffix}")
+        except OSError:
+            continue
+        if stat.S_ISREG(compressed_stat.st_mode):
+            return FileResponse(
+                f"{full_path}{suffix}",
+                status_code=status_code,
+                stat_result=compressed_stat,
+                media_type=mimetypes.guess_type(str(full_path))[0] or "application/octet-stream",
+                headers={"Content-Encoding": encoding},
+            )
+    return None
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check (weak comparison, `*` matches anything). Shared by every route that sends an ETag."""
+    if not if_none_match or not etag:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def file_response(full_path, request_headers: Headers, cache_control: str, stat_result=None, status_code: int = 200):
+    """Precompressed when possible, 304 on a matching If-None-Match, with cache headers set."""
+    response = precompressed_response(full_path, request_headers.get("accept-encoding", ""), status_code) \
+        or FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+    etag = response.headers.get("etag")
+    if etag_matches(request_headers.get("if-none-match", ""), etag):
+        response = NotModifiedResponse(response.headers)
+    response.headers["Cache-Control"] = cache_control
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def __init__(self, *args, cache_control: str = IMMUTABLE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        return file_response(full_path, Headers(scope=scope), self.cache_control, stat_result, status_code)
@@ -0,0 +1,207 @@
+from sqlalchemy import update, case, and_, func
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+import os
+import threading
+import models
+import task_events
+import change_log
+import sequences
+
+# Statuses that are derived from dates (everything else is terminal/explicit)
+OPEN_STATUSES = ["Pending", "Overdue"]
+
+# counters row holding date.toordinal() of the last completed daily rollover (any process)
+ROLLOVER_COUNTER = "status_rollover"
+# How long after midnight requests leave the rollover to the scheduler before doing it themselves
+SCHEDULER_GRACE_SECONDS = int(os.getenv("SCHEDULER_GRACE_SECONDS", 120))
+
+_rollover_lock = threading.Lock()
+_last_rollover_date = None
+_scheduler_owned = False
+
+
+def derive_status(completion_date, deadline_date, today: date = None):
+    """Status for a single task given its completion and deadline values."""
+    today = today or date.today()
+    if completion_date and str(completion_date).strip():
+        return "Completed"
+    if deadline_date and deadline_date < today:
+        return "Overdue"
+    return "Pending"
+
+
+def format_deadline_due_in(completion_date, deadline_date, today: date = None) -> str:
+    """Same text as formatDeadlineDisplay in TaskTable.jsx."""
+    if completion_date and str(completion_date).strip():
+        return "Completed"
+    if not deadline_date or deadline_date.year < 2000:
+        return "-"
+    diff = (deadline_date - (today or date.today())).days
+    if diff < -2000:
+        return "-"
+    return {0: "Today", 1: "Tomorrow", -1: "Yesterday"}.get(diff, f"{diff} days")
+
+
+def sync_task_status(task):
+    """Recompute the status and due-in text of one ORM task after its fields were edited."""
+    task.status = derive_status(task.completion_date, task.deadline_date)
+    task.deadline_due_in = format_deadline_due_in(task.completion_date, task.deadline_date)
+
+
+def derived_status_expr(today: date):
+    """SQL version of derive_status over the row's own columns."""
+    is_completed = and_(
+        models.Task.completion_date.isnot(None),
+        func.trim(models.Task.completion_date) != "",
+    )
+    return case(
+        (is_completed, "Completed"),
+        (models.Task.deadline_date < today, "Overdue"),
+        else_="Pending",
+    )
+
+
+def sync_statuses(db: Session, ids, today: date = None):
+    """
+    Set-based sync_task_status for tasks written without loading them (bulk paths).
+    Part of the caller's write: updated_at keeps the value that write stored.
+    """
+    if not ids:
+        return
+    target_status = derived_status_expr(today or date.today())
+    db.execute(
+        update(models.Task)
+        .where(models.Task.id.in_(ids), models.Task.status.is_distinct_from(target_status))
+        .values(status=target_status, updated_at=models.Task.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rollover_statuses(db: Session, today: date = None) -> int:
+    """
+    Moves open tasks to the status implied by `today` with one set-based UPDATE.
+    Only rows whose status actually changes are written. Returns the row count.
+    """
+    today = today or date.today()
+    target_status = derived_status_expr(today)
+    criteria = (models.Task.status.in_(OPEN_STATUSES), models.Task.status != target_status)
+    change_log.record_matching(db, *criteria)
+    stmt = (
+        update(models.Task)
+        .where(*criteria)
+        .values(status=target_status)
+        .execution_options(synchronize_session=False)
+    )
+    result = db.execute(stmt)
+    return result.rowcount or 0
+
+
+def _write_deadline_due_in(db: Session, rows, today: date, chunk_size: int) -> int:
+    changed = []
+    for task_id, completion_date, deadline_date, current, updated_at in rows:
+        text = format_deadline_due_in(completion_date, deadline_date, today)
+        if text != current:
+            # updated_at passed through unchanged so its onupdate default doesn't fire
+            changed.append({"id": task_id, "deadline_due_in": text, "updated_at": updated_at})
+    for start in range(0, len(changed), chunk_size):
+        db.execute(
+            update(models.Task).execution_options(synchronize_session=False),
+            changed[start:start + chunk_size],
+        )
+    return len(changed)
+
+
+def _deadline_due_in_query(db: Session):
+    return db.query(
+        models.Task.id, models.Task.completion_date, models.Task.deadline_date,
+        models.Task.deadline_due_in, models.Task.updated_at,
+    )
+
+
+def recompute_deadline_due_in(db: Session, today: date = None, chunk_size: int = 1000) -> int:
+    """
+    Rewrites the `deadline_due_in` text for tasks whose value changed with the date.
+    It is a display field, so neither updated_at nor the change log is touched.
+    """
+    rows = _deadline_due_in_query(db).execution_options(yield_per=chunk_size)
+    return _write_deadline_due_in(db, rows, today or date.today(), chunk_size)
+
+
+def sync_deadlines_due_in(db: Session, ids, today: date = None, chunk_size: int = 1000) -> int:
+    """Set-based due-in text for tasks written without loading them (bulk paths)."""
+    ids = list(ids)
+    changed = 0
+    for start in range(0, len(ids), chunk_size):
+        rows = _deadline_due_in_query(db).filter(models.Task.id.in_(ids[start:start + chunk_size])).all()
+        changed += _write_deadline_due_in(db, rows, today or date.today(), chunk_size)
+    return changed
+
+
+def run_daily_rollover(db: Session, today: date):
+    """
+    Statuses and due-in text for `today`, stamped in the counters table so other
+    processes know it is done. Commits. Returns (statuses changed, due-in texts changed).
+    """
+    try:
+        changed = rollover_statuses(db, today)
+        due_in = recompute_deadline_due_in(db, today)
+        sequences.advance_counter(db, ROLLOVER_COUNTER, today.toordinal())
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    mark_rollover_done(today)
+    return changed, due_in
+
+
+def hand_off_to_scheduler():
+    """
+    Called when the background scheduler runs in this process. Requests then leave the
+    rollover to the leader and only step in if it hasn't happened by the grace period.
+    """
+    global _scheduler_owned
+    _scheduler_owned = True
+
+
+def mark_rollover_done(today: date):
+    global _last_rollover_date
+    _last_rollover_date = today
+
+
+def _leader_rolled_over(db: Session, today: date) -> bool:
+    """With the scheduler on: True while the leader still has time, or once it has stamped today."""
+    now = datetime.now()
+    if now.hour * 3600 + now.minute * 60 + now.second < SCHEDULER_GRACE_SECONDS:
+        return True
+    if sequences.counter_value(db, ROLLOVER_COUNTER) == today.toordinal():
+        mark_rollover_done(today)
+        return True
+    return False
+
+
+def ensure_statuses_current(db: Session):
+    """
+    Runs the daily rollover at most once per calendar day per process.
+    Everything else on the read path stays read-only.
+    With scheduler.py on this is a fallback: it only runs if no leader has done today's
+    rollover SCHEDULER_GRACE_SECONDS after midnight (one counters lookup a day otherwise).
+    Never waits: while another request is rolling over, callers read the current statuses.
+    """
+    today = date.today()
+    if _last_rollover_date == today:
+        return
+    if _scheduler_owned and _leader_rolled_over(db, today):
+        return
+
+    if not _rollover_lock.acquire(blocking=False):
+        return
+    try:
+        if _last_rollover_date == today:
+            return
+        changed, due_in = run_daily_rollover(db, today)
+    finally:
+        _rollover_lock.release()
+    if changed or due_in:
+        print(f"🔄 Status rollover for {today}: {changed} statuses, {due_in} due-in texts updated")
+        task_events.publish("tasks", "rollover", None)
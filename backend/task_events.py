@@ -0,0 +1,31 @@
+# task_events.py
+# In-process notifications for writes. Routers publish after a successful commit;
+# caches and other derived state subscribe to know when to drop what they hold.
+
+import threading
+
+_subscribers = []
+_lock = threading.Lock()
+
+
+def subscribe(callback):
+    """Registers callback(topic, action, ids, rows). Usable as a decorator."""
+    with _lock:
+        _subscribers.append(callback)
+    return callback
+
+
+def publish(topic: str, action: str, ids=None, rows=None):
+    """
+    topic: "tasks" or "employees"
+    action: "create", "update", "delete", "bulk_update", "rollover", ...
+    ids: primary keys touched, or None when the change is set-based
+    rows: optional list of dicts with the changed values (full rows or partial deltas)
+    """
+    with _lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(topic, action, ids, rows)
+        except Exception as e:
+            print(f"⚠️ task_events subscriber {getattr(callback, '__name__', callback)} failed: {e}")
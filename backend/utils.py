@@ -1,9 +1,41 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
+# pbkdf2 is slow on purpose (~tens of ms per call). The async variants run it on a small
+# dedicated pool, so a burst of logins queues there instead of tying up the event loop or
+# the shared request threadpool. Beyond PASSWORD_HASH_MAX_PENDING waiting calls we refuse.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+class HashingBusy(Exception):
+    """Raised when too many password hashes are already queued."""
+
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
+
+async def _run_hashing(function, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, function, *args)
+    finally:
+        _hash_slots.release()
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_hashing(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await _run_hashing(get_password_hash, password)
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useMemo, useRef, useState } from 'react';
 import { useLocation } from 'react-router-dom';
 import Layout from '../components/Layout';
 import StatCard from '../components/StatCard';
@@ -20,8 +20,11 @@ const Dashboard = () => {
     const [loading, setLoading] = useState(true);
     const [isAddModalOpen, setIsAddModalOpen] = useState(false);
     const [activeTab, setActiveTab] = useState('all'); // 'all' | 'today'
-    const [allEmployees, setAllEmployees] = useState([]); // Full list for dropdowns
     const [employeeObjects, setEmployeeObjects] = useState([]); // Full employee data for WhatsApp lookup
+    const allEmployees = useMemo( // Full list for dropdowns
+        () => employeeObjects.map(e => e.display_name).sort(),
+        [employeeObjects]
+    );
     const [isDuplicatesModalOpen, setIsDuplicatesModalOpen] = useState(false);
     const [isActionsDropdownOpen, setIsActionsDropdownOpen] = useState(false);
 
@@ -242,7 +245,6 @@ const Dashboard = () => {
             setTasks(tasksData);
             setStats(statsData);
             setEmployeeObjects(employeesData);
-            setAllEmployees(employeesData.map(e => e.display_name).sort());
         } catch (error) {
             console.error("Failed to fetch data:", error);
             // Don't alert on silent polling errors to avoid spamming user
@@ -252,15 +254,97 @@ const Dashboard = () => {
         }
     };
 
+    const refreshStats = async () => {
+        try {
+            setStats(await api.getStats());
+        } catch (error) {
+            console.error("Failed to refresh stats:", error);
+        }
+    };
+
+    // Does a (possibly partial) task row still belong in the current filtered list?
+    // Search is matched server-side (full text), so it is not checked here; see applyTaskEvent.
+    const matchesFilters = (task) => {
+        if (selectedAgency.length > 0 && !selectedAgency.includes(task.assigned_agency)) return false;
+        if (selectedStatus.length > 0 && !selectedStatus.includes(task.status)) return false;
+        return true;
+    };
+
+    const applyTaskEvent = ({ action, ids, rows }) => {
+        if (action === 'delete') {
+            setTasks(prev => prev.filter(t => !ids.includes(t.id)));
+            refreshStats();
+            return;
+        }
+        if (!rows || search) {
+            // Set-based change (e.g. daily status rollover), resync, or a search is active
+            // (only the server can tell whether an edited row still matches it): reload
+            fetchData(true);
+            return;
+        }
+        const canInsert = action === 'create';
+        // A row we don't hold may have moved into our filter; only a refetch can tell
+        const held = new Set(tasks.map(t => t.id));
+        const needsReload = !canInsert && rows.some(row => !held.has(row.id));
+        setTasks(prev => {
+            const byId = new Map(prev.map(t => [t.id, t]));
+            rows.forEach(row => {
+                const existing = byId.get(row.id);
+                if (existing) {
+                    const merged = { ...existing, ...row };
+                    if (matchesFilters(merged)) byId.set(row.id, merged);
+                    else byId.delete(row.id);
+                } else if (canInsert && matchesFilters(row)) {
+                    byId.set(row.id, row);
+                }
+            });
+            return Array.from(byId.values());
+        });
+        if (needsReload) fetchData(true);
+        else refreshStats();
+    };
+
+    const applyEmployeeEvent = ({ action, ids, rows }) => {
+        setEmployeeObjects(prev => {
+            const next = prev.filter(e => !ids.includes(e.id));
+            return action !== 'delete' && rows ? [...next, ...rows] : next;
+        });
+    };
+
+    // The event stream lives as long as the page; its callbacks go through this ref so they
+    // always see the current filters and list without reopening the connection
+    const liveRef = useRef({});
+    useEffect(() => {
+        liveRef.current = { fetchData, applyTaskEvent, applyEmployeeEvent };
+    });
+
     useEffect(() => {
         fetchData();
-        // Auto-Refresh every 10 seconds (Silent)
-        const interval = setInterval(() => {
-            fetchData(true);
-        }, 10000);
-        return () => clearInterval(interval);
     }, [search, selectedAgency, selectedStatus]);
 
+    useEffect(() => {
+        // Live updates replace interval polling; fall back to polling only while the stream is down
+        let fallback = null;
+        const unsubscribe = api.subscribeEvents({
+            onOpen: () => {
+                if (fallback) {
+                    clearInterval(fallback);
+                    fallback = null;
+                    liveRef.current.fetchData(true); // Catch up on anything missed while disconnected
+                }
+            },
+            onError: () => {
+                if (!fallback) fallback = setInterval(() => liveRef.current.fetchData(true), 30000);
+            },
+            onTasks: (event) => liveRef.current.applyTaskEvent(event),
+            onEmployees: (event) => liveRef.current.applyEmployeeEvent(event),
+        });
+        return () => {
+            unsubscribe();
+            if (fallback) clearInterval(fallback);
+        };
+    }, []);
+
     const handleLogout = () => {
         localStorage.removeItem('user');
         window.location.href = '/login';
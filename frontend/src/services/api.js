@@ -5,6 +5,14 @@ const BASE_URL = import.meta.env.VITE_API_URL || (import.meta.env.PROD ? '' : 'h
 const API_URL = `${BASE_URL}/api/tasks`;
 const EMP_URL = `${BASE_URL}/api/employees`;
 const AUTH_URL = `${BASE_URL}/api/auth`;
+const EVENTS_URL = `${BASE_URL}/api/events/stream`;
+
+// Columns the list views actually render (skips attachment_data and remarks)
+const TASK_LIST_FIELDS = [
+    'id', 'task_number', 'description', 'assigned_agency', 'priority', 'status',
+    'allocated_date', 'deadline_date', 'completion_date', 'deadline_due_in', 'time_given',
+    'is_pinned', 'scheduled_date', 'scheduled_time', 'position', 'source', 'updated_at'
+].join(',');
 
 export const api = {
     // --- Auth ---
@@ -36,11 +44,38 @@ export const api = {
         if (filters.status) params.append('status', filters.status);
         if (filters.search) params.append('search', filters.search);
         if (filters.sortBy) params.append('sort_by', filters.sortBy);
+        params.append('fields', filters.fields || TASK_LIST_FIELDS);
 
         const response = await axios.get(`${API_URL}/?${params.toString()}`);
         return response.data;
     },
 
+    getTasksPage: async (filters = {}, cursor = null, limit = 200) => {
+        // Keyset pagination: pass the returned nextCursor back in to get the next page
+        const params = new URLSearchParams();
+        if (filters.agency) params.append('agency', filters.agency);
+        if (filters.status) params.append('status', filters.status);
+        if (filters.search) params.append('search', filters.search);
+        if (filters.sortBy) params.append('sort_by', filters.sortBy);
+        params.append('fields', filters.fields || TASK_LIST_FIELDS);
+        params.append('limit', limit);
+        if (cursor) params.append('cursor', cursor);
+
+        const response = await axios.get(`${API_URL}/?${params.toString()}`);
+        const total = response.headers['x-total-count'];
+        return {
+            items: response.data,
+            nextCursor: response.headers['x-next-cursor'] || null,
+            total: total !== undefined ? parseInt(total) : null
+        };
+    },
+
+    getChanges: async (since, fields = TASK_LIST_FIELDS) => {
+        // Delta sync: { version, has_more, reset, upserts, deleted }
+        const response = await axios.get(`${API_URL}/changes`, { params: { since, fields } });
+        return response.data;
+    },
+
     getStats: async () => {
         const response = await axios.get(`${API_URL}/stats`);
         return response.data;
@@ -67,6 +102,37 @@ export const api = {
         return response.data;
     },
 
+    uploadAttachment: async (taskId, file) => {
+        const form = new FormData();
+        form.append('file', file);
+        const response = await axios.put(`${API_URL}/${taskId}/attachment`, form);
+        return response.data;
+    },
+
+    attachmentUrl: (taskId) => `${API_URL}/${taskId}/attachment`,
+
+    deleteAttachment: async (taskId) => {
+        const response = await axios.delete(`${API_URL}/${taskId}/attachment`);
+        return response.data;
+    },
+
+    // --- Spreadsheet export / import ---
+    exportTasksUrl: (filters = {}, format = 'csv') => {
+        const params = new URLSearchParams({ format });
+        if (filters.agency) params.append('agency', filters.agency);
+        if (filters.status) params.append('status', filters.status);
+        if (filters.search) params.append('search', filters.search);
+        return `${API_URL}/export?${params.toString()}`;
+    },
+
+    importTasks: async (file, dryRun = false) => {
+        // Returns { created, updated, failed, errors: [{ row, task_number, error }] }
+        const form = new FormData();
+        form.append('file', file);
+        const response = await axios.post(`${API_URL}/import`, form, { params: { dry_run: dryRun } });
+        return response.data;
+    },
+
     getDuplicates: async () => {
         const response = await axios.get(`${API_URL}/duplicates`);
         return response.data;
@@ -93,5 +159,25 @@ export const api = {
         return response.data;
     },
 
+    // --- Live Updates (Server-Sent Events) ---
+    // handlers: { onTasks(event), onEmployees(event), onOpen(), onError() }
+    // Each event is { action, ids, rows }. Returns an unsubscribe function.
+    subscribeEvents: (handlers = {}) => {
+        const source = new EventSource(EVENTS_URL);
+        const parse = (handler) => (e) => {
+            if (!handler) return;
+            try {
+                handler(JSON.parse(e.data));
+            } catch (err) {
+                console.error("Bad event payload:", err);
+            }
+        };
+        source.addEventListener('tasks', parse(handlers.onTasks));
+        source.addEventListener('employees', parse(handlers.onEmployees));
+        source.addEventListener('hello', () => handlers.onOpen && handlers.onOpen());
+        source.onerror = () => handlers.onError && handlers.onError();
+        return () => source.close();
+    },
+
 
 };